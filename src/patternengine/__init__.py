@@ -2,8 +2,12 @@
 
 import patternengine.bullets  # noqa: F401
 
-from patternengine.engine import (BulletSource, Factory, Fan, Heartbeat,
-                                  Stack)
+from patternengine.engine import (BakedSource, BulletBudget, BulletSource, Clock,
+                                  CompiledPattern, EmitBuffer, Factory, FactoryScheduler, Fan,
+                                  Heartbeat, PatternInstance, PatternTemplate, Stack, Symmetry,
+                                  Timeline, Transform, bake, per_bullet)
 from patternengine.bullet import *  # noqa: F401, F403
 from patternengine.poms import *  # noqa: F401, F403
-from patternengine.rings import (EmitSource, Disk, Line, Point, Rectangle, Ring)
+from patternengine.pool import BulletPool
+from patternengine.rings import (EmitSource, Disk, Line, Path, Point, Rectangle,
+                                 Ring, Silhouette)
@@ -76,6 +76,6 @@ class Bullet(pygame.sprite.Sprite):
         self.world = world
 
     def update(self, dt):
-        for m in list(self.mutators.values()): m(dt)
+        for m in self.mutators.compiled: m(dt)
 
         self.rect.center = self.poms.position
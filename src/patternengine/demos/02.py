@@ -7,7 +7,7 @@ from pgcooldown import Cooldown, LerpThing
 from glm import vec2
 
 from patternengine.bullet import Bullet
-from patternengine.poms import POMS, Mutator, MomentumMutator, TurnMutator, AlignWithMomentumMutator
+from patternengine.poms import POMS, Mutator, IntegratorMutator
 
 TITLE = 'pygame minimal template'
 SCREEN = pygame.Rect(0, 0, 1024, 768)
@@ -45,11 +45,8 @@ def sprite_factory(position, momentum, anchor, bullet_speed, image, world,
     bullet = Bullet(image,
                     POMS(position + anchor, 0, momentum * bullet_speed, turn),
                     group, world=world)
-    bullet.mutators.add(MomentumMutator(bullet))
-
-    if turn:
-        bullet.mutators.add(TurnMutator(bullet))
-        bullet.mutators.add(AlignWithMomentumMutator(bullet))
+    bullet.mutators.add(IntegratorMutator(bullet, turn=bool(turn),
+                                          align='momentum' if turn else None))
 
     if zigzag:
         bullet.mutators.add(ZigZagMutator(bullet, zigzag, 1 / 3))
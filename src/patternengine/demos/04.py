@@ -7,7 +7,7 @@ from pgcooldown import Cooldown, LerpThing
 from glm import vec2
 
 from patternengine.bullet import Bullet
-from patternengine.poms import POMS, MomentumMutator, TurnMutator, AlignWithMomentumMutator
+from patternengine.poms import POMS, IntegratorMutator
 
 TITLE = 'pygame minimal template'
 SCREEN = pygame.Rect(0, 0, 1024, 768)
@@ -23,11 +23,7 @@ def sprite_factory(position, momentum, anchor, bullet_speed, image, world,
                    group, turn=0, cls=Bullet, **kwargs):
     bullet = Bullet(image, POMS(position + anchor, 0, momentum * bullet_speed, turn),
                     group, world=world)
-    bullet.mutators.add(MomentumMutator(bullet))
-    if turn:
-        bullet.mutators.add(TurnMutator(bullet))
-
-    bullet.mutators.add(AlignWithMomentumMutator(bullet))
+    bullet.mutators.add(IntegratorMutator(bullet, turn=bool(turn), align='momentum'))
 
 
 def danmaku_demo_00(position, sprite_factory, aim=0, turn=0):
@@ -9,10 +9,12 @@ FIXME
 
 
 import glm
+import numpy as np
 
 from abc import ABC, abstractmethod
+from math import atan2, cos, degrees, hypot, radians, sin
+from types import MethodType
 from pgcooldown import Cooldown
-from patternengine.peglm import clamp
 
 __all__ = [
     'POMS',
@@ -23,6 +25,7 @@ __all__ = [
     'AlignWithMomentumMutator',
     'AlignWithTargetMutator',
     'BounceMutator',
+    'IntegratorMutator',
     'MomentumMutator',
     'SpinMutator',
     'TurnMutator',
@@ -44,7 +47,12 @@ class POMS:
 
     The class itself doesn't contain any methods, but it provides a defined
     interface for all mutators below.
+
+    The built-in mutators update `position` and `momentum` in place.  Don't
+    share these vectors between objects, assign a copy instead.
     """
+    __slots__ = ('position', 'orientation', 'momentum', 'spin', 'max_speed', 'max_spin')
+
     def __init__(self, position, orientation=0, momentum=None, spin=0, max_speed=0, max_spin=0):
         self.position = glm.vec2(position)
         self.orientation = orientation
@@ -61,17 +69,63 @@ class MutatorStack(dict):
     """The mutator stack for an object that has a POMS attribute.
 
     The MutatorStack is nothing more than a dict that has an additional `run` method.
+
+    The mutators are run from `compiled`, a tuple of their bound ``__call__``
+    methods, that is only rebuilt when mutators are added or removed.
+    Mutators can add or remove mutators of their parent while the stack is
+    running.  The tuple of the running frame stays as it is, and the changes
+    take effect with the next run.
     """
     def __init__(self, *args, **kwargs):
+        self._compiled = None
         super().__init__(**kwargs)
         if args:
             self.add(*args)
 
+    @property
+    def compiled(self):
+        """The bound ``__call__`` methods of all mutators, in order."""
+        if self._compiled is None:
+            self._compiled = tuple(m.__call__ for m in self.values())
+        return self._compiled
+
     def run(self, *args, **kwargs):
         """Run all mutators with *args, **kwargs passed into them."""
-        for m in self.values():
+        for m in self.compiled:
             m(*args, **kwargs)
 
+    def __setitem__(self, key, mutator):
+        super().__setitem__(key, mutator)
+        self._compiled = None
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._compiled = None
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def clear(self):
+        super().clear()
+        self._compiled = None
+
+    def pop(self, *args):
+        self._compiled = None
+        return super().pop(*args)
+
+    def popitem(self):
+        self._compiled = None
+        return super().popitem()
+
+    def setdefault(self, key, default=None):
+        self._compiled = None
+        return super().setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._compiled = None
+
     def add(self, *args):
         for arg in args:
             if arg is None: continue
@@ -99,11 +153,54 @@ class Mutator(ABC):
     `__init__`.  This is mandatory.  Also calling `super().__init__(parent)`
     is mandatory.  Everything beyond that is responsibility of the derived
     child class.
+
+    A `BulletPool` runs a mutator once for many bullets through
+    `apply_batch`.  Override it to vectorize a mutator, the default falls
+    back to calling the mutator for every bullet.
+
+    Mutators with a `poms` attribute name look up the POMS of their parent
+    only once, on the first call.  Setting a new `parent` drops it.
     """
 
     def __init__(self, parent):
         self.parent = parent
 
+    @property
+    def parent(self):
+        return self._parent
+
+    @parent.setter
+    def parent(self, parent):
+        self._parent = parent
+        self._poms = None
+
+    def _bind(self):
+        """Look up and keep the POMS of the parent."""
+        self._poms = getattr(self._parent, self.poms)
+        return self._poms
+
+    def apply_batch(self, dt, pool, indices):
+        """Run the mutator on many bullets of a `BulletPool` at once.
+
+        :param dt: The delta time since the last frame.
+        :param pool: The `BulletPool`.
+        :param indices: A slice or an index array of the bullets in `pool`.
+
+        The default calls the mutator once per bullet, with its `parent`
+        temporarily replaced by a stand in bullet, whose ``poms`` is read
+        from and written back into the pool.
+
+        Mutators that don't depend on their instance can override this as a
+        ``classmethod``, and be passed to the pool as a class.
+        """
+        parent = self.parent
+        try:
+            for bullet in pool.bullets(indices):
+                self.parent = bullet
+                self(dt)
+        finally:
+            self.parent = parent
+
     @abstractmethod
     def __call__(self, dt):
         """Run the mutator
@@ -135,12 +232,24 @@ class MomentumMutator(Mutator):
         self.poms = poms
 
     def __call__(self, dt):
-        poms = getattr(self.parent, self.poms)
+        poms = self._poms or self._bind()
+        position, momentum = poms.position, poms.momentum
 
-        if poms.max_speed:
-            poms.position = poms.position + clamp(poms.momentum, poms.max_speed) * dt
-        else:
-            poms.position = poms.position + poms.momentum * dt
+        if poms.max_speed and (speed := hypot(momentum.x, momentum.y)) > poms.max_speed:
+            dt *= poms.max_speed / speed
+        position.x += momentum.x * dt
+        position.y += momentum.y * dt
+
+    @classmethod
+    def apply_batch(cls, dt, pool, indices):
+        momentum, max_speed = pool.momentum[indices], pool.max_speed[indices]
+        if max_speed.any():
+            speed = np.hypot(momentum[:, 0], momentum[:, 1])
+            clamped = (max_speed != 0) & (speed > max_speed)
+            scale = np.divide(max_speed, speed, out=np.ones_like(speed), where=clamped)
+            momentum = momentum * scale[:, np.newaxis]
+
+        pool.position[indices] += momentum * dt
 
 
 class SpinMutator(Mutator):
@@ -149,12 +258,17 @@ class SpinMutator(Mutator):
         self.poms = poms
 
     def __call__(self, dt):
-        poms = getattr(self.parent, self.poms)
+        poms = self._poms or self._bind()
         if poms.max_spin:
             poms.orientation = (poms.orientation + min(poms.spin, poms.max_spin) * dt) % 360
         else:
             poms.orientation = (poms.orientation + poms.spin * dt) % 360
 
+    @classmethod
+    def apply_batch(cls, dt, pool, indices):
+        pool.orientation[indices] = (pool.orientation[indices]
+                                     + _batch_spin(pool, indices) * dt) % 360
+
 
 class AlignWithMomentumMutator(Mutator):
     def __init__(self, parent, poms='poms'):
@@ -162,8 +276,14 @@ class AlignWithMomentumMutator(Mutator):
         self.poms = poms
 
     def __call__(self, dt):
-        poms = getattr(self.parent, self.poms)
-        poms.orientation = glm.degrees(glm.atan2(*poms.momentum) - glm.half_pi())
+        poms = self._poms or self._bind()
+        momentum = poms.momentum
+        poms.orientation = degrees(atan2(momentum.x, momentum.y)) - 90
+
+    @classmethod
+    def apply_batch(cls, dt, pool, indices):
+        x, y = pool.momentum[indices].T
+        pool.orientation[indices] = np.degrees(np.arctan2(x, y) - np.pi / 2)
 
 
 class TurnMutator(Mutator):
@@ -172,13 +292,21 @@ class TurnMutator(Mutator):
         self.poms = poms
 
     def __call__(self, dt):
-        poms = getattr(self.parent, self.poms)
-        phi = glm.radians(poms.spin)
-        max_phi = glm.radians(poms.max_spin)
-        if poms.max_spin:
-            poms.momentum = glm.rotate(poms.momentum, min(phi, max_phi) * dt)
-        else:
-            poms.momentum = glm.rotate(poms.momentum, phi * dt)
+        poms = self._poms or self._bind()
+        phi = radians(min(poms.spin, poms.max_spin) if poms.max_spin else poms.spin) * dt
+        c, s = cos(phi), sin(phi)
+
+        momentum = poms.momentum
+        x, y = momentum.x, momentum.y
+        momentum.x = c * x - s * y
+        momentum.y = s * x + c * y
+
+    @classmethod
+    def apply_batch(cls, dt, pool, indices):
+        phi = np.radians(_batch_spin(pool, indices)) * dt
+        c, s = np.cos(phi), np.sin(phi)
+        x, y = pool.momentum[indices].T
+        pool.momentum[indices] = np.stack((c * x - s * y, s * x + c * y), axis=1)
 
 
 class AimTargetMutator(Mutator):
@@ -228,6 +356,22 @@ class AlignWithTargetMutator(Mutator):
             ppoms.momentum = glm.rotate(ppoms.momentum, angle * dt)
 
 
+class _batchmethod:
+    """Like `classmethod`, but bound to the instance when called on one.
+
+    For `Mutator.apply_batch` of mutators that can be passed to a
+    `BulletPool` either as a class, using the attributes of the pool, or as
+    an instance, using its own attributes.
+    """
+
+    def __init__(self, func):
+        self.__func__ = func
+        self.__doc__ = func.__doc__
+
+    def __get__(self, instance, owner=None):
+        return MethodType(self.__func__, owner if instance is None else instance)
+
+
 class AccelerationMutator(Mutator):
     def __init__(self, parent, acceleration, poms='poms'):
         super().__init__(parent)
@@ -235,8 +379,22 @@ class AccelerationMutator(Mutator):
         self.acceleration = acceleration
 
     def __call__(self, dt):
-        poms = getattr(self.parent, self.poms)
-        poms.momentum += self.acceleration * dt
+        poms = self._poms or self._bind()
+        momentum, acceleration = poms.momentum, self.acceleration
+        momentum.x += acceleration.x * dt
+        momentum.y += acceleration.y * dt
+
+    @_batchmethod
+    def apply_batch(self, dt, pool, indices):
+        """Accelerate the bullets.
+
+        As a class, by the acceleration of every bullet in the pool, as an
+        instance, by its own `acceleration`.
+        """
+        if isinstance(self, type):
+            pool.momentum[indices] += pool.acceleration[indices] * dt
+        else:
+            pool.momentum[indices] += np.array(tuple(self.acceleration)) * dt
 
 
 class AlignWithAccelerationMutator(Mutator):
@@ -245,12 +403,127 @@ class AlignWithAccelerationMutator(Mutator):
         self.poms = poms
 
     def __call__(self, dt):
-        poms = getattr(self.parent, self.poms)
+        poms = self._poms or self._bind()
         accel = self.parent.mutators[AccelerationMutator].acceleration
 
         poms.orientation = glm.degrees(glm.atan2(*accel) - glm.half_pi())
 
 
+class IntegratorMutator(Mutator):
+    """Integrate a POMS in a single pass, replacing a stack of mutators.
+
+    :param parent: The parent object
+    :param acceleration: Optional, a vector added to the momentum per second
+    :param turn: Optional, rotate the momentum by the spin
+    :param spin: Optional, rotate the orientation by the spin
+    :param align: Optional, align the orientation with ``'momentum'`` or
+        ``'acceleration'``
+    :param poms: The attribute **name** of the POMS attribute in the parent class
+    :raises ValueError: For an unknown `align`, or ``'acceleration'``
+        without an `acceleration`.
+
+    Every frame, the steps run in this order:
+
+    1. Accelerate the momentum, like `AccelerationMutator`
+    2. Turn the momentum, like `TurnMutator`
+    3. Move the position by the momentum, clamped to `max_speed`, like
+       `MomentumMutator`
+    4. Spin the orientation, like `SpinMutator`, unless it's aligned
+    5. Align the orientation, like `AlignWithMomentumMutator` or
+       `AlignWithAccelerationMutator`
+
+    This is the same as a stack of these mutators, but costs a single call
+    per frame, and the POMS, the clamped spin and the momentum are only read
+    once.  Note that the momentum is turned before it's moved, as in the
+    order of the stack above.
+
+    In a `BulletPool`, an instance integrates all bullets in one vectorized
+    pass, see `apply_batch`.
+    """
+
+    ALIGN = (None, 'momentum', 'acceleration')
+
+    def __init__(self, parent, acceleration=None, turn=False, spin=False, align=None,
+                 poms='poms'):
+        if align not in self.ALIGN:
+            raise ValueError(f'Unknown align {align!r}, must be one of {self.ALIGN}')
+        if align == 'acceleration' and acceleration is None:
+            raise ValueError("align='acceleration' needs an acceleration")
+
+        super().__init__(parent)
+        self.acceleration = acceleration
+        self.turn = turn
+        self.spin = spin
+        self.align = align
+        self.poms = poms
+
+    def __call__(self, dt):
+        poms = self._poms or self._bind()
+        momentum, acceleration = poms.momentum, self.acceleration
+        mx, my = momentum.x, momentum.y
+
+        if acceleration is not None:
+            mx += acceleration.x * dt
+            my += acceleration.y * dt
+
+        if self.turn or self.spin:
+            rate = min(poms.spin, poms.max_spin) if poms.max_spin else poms.spin
+            if self.turn and rate:
+                phi = radians(rate) * dt
+                c, s = cos(phi), sin(phi)
+                mx, my = c * mx - s * my, s * mx + c * my
+
+        momentum.x, momentum.y = mx, my
+
+        step = dt
+        if poms.max_speed and (speed := hypot(mx, my)) > poms.max_speed:
+            step *= poms.max_speed / speed
+        position = poms.position
+        position.x += mx * step
+        position.y += my * step
+
+        if self.align == 'momentum':
+            poms.orientation = degrees(atan2(mx, my)) - 90
+        elif self.align == 'acceleration':
+            poms.orientation = degrees(atan2(acceleration.x, acceleration.y)) - 90
+        elif self.spin:
+            poms.orientation = (poms.orientation + rate * dt) % 360
+
+    def apply_batch(self, dt, pool, indices):
+        """Integrate the bullets of a `BulletPool`, in the same steps as above."""
+        momentum = pool.momentum[indices]
+        if self.acceleration is not None:
+            momentum = momentum + np.array(tuple(self.acceleration)) * dt
+
+        if self.turn or self.spin:
+            spin, max_spin = pool.spin[indices], pool.max_spin[indices]
+            rate = np.where(max_spin != 0, np.minimum(spin, max_spin), spin)
+            if self.turn:
+                phi = np.radians(rate) * dt
+                c, s = np.cos(phi), np.sin(phi)
+                mx, my = momentum.T
+                momentum = np.stack((c * mx - s * my, s * mx + c * my), axis=1)
+
+        pool.momentum[indices] = momentum
+
+        max_speed = pool.max_speed[indices]
+        step = momentum
+        if max_speed.any():
+            speed = np.hypot(momentum[:, 0], momentum[:, 1])
+            clamped = (max_speed != 0) & (speed > max_speed)
+            scale = np.divide(max_speed, speed, out=np.ones_like(speed), where=clamped)
+            step = momentum * scale[:, np.newaxis]
+        pool.position[indices] += step * dt
+
+        if self.align == 'momentum':
+            pool.orientation[indices] = np.degrees(np.arctan2(momentum[:, 0], momentum[:, 1])) - 90
+        elif self.align == 'acceleration':
+            acceleration = self.acceleration
+            pool.orientation[indices] = degrees(atan2(acceleration.x, acceleration.y)) - 90
+        elif self.spin:
+            pool.orientation[indices] = (pool.orientation[indices] + rate * dt) % 360
+
+
 class WorldMutator(Mutator):
     def __init__(self, parent, world, poms='poms'):
         super().__init__(parent)
@@ -258,12 +531,29 @@ class WorldMutator(Mutator):
         self.poms = poms
 
     def __call__(self, dt):
-        poms = getattr(self.parent, self.poms)
+        poms = self._poms or self._bind()
         if not self.world.collidepoint(poms.position):
             # Remove circular referencing of parent in the mutators
             self.parent.mutators.clear()
             self.parent.kill()
 
+    @_batchmethod
+    def apply_batch(self, dt, pool, indices):
+        """Kill all bullets outside of the world.
+
+        As a class, the world of the pool, as an instance, its own `world`.
+        """
+        world = pool.world if isinstance(self, type) else self.world
+        if world is None:
+            return
+
+        left, top, width, height = world
+        index = np.arange(len(pool))[indices]
+        x, y = pool.position[index].T
+        inside = (x >= left) & (x < left + width) & (y >= top) & (y < top + height)
+        if not inside.all():
+            pool.kill(index[~inside])
+
 
 class LifetimeMutator(Mutator):
     def __init__(self, parent, lifetime):
@@ -298,3 +588,9 @@ class BounceMutator(Mutator):
         elif position.y < self.world.top:
             position.y = -position.y
             momentum.y = -momentum.y
+
+
+def _batch_spin(pool, indices):
+    """Return the spin of the bullets, clamped by their `max_spin`."""
+    spin, max_spin = pool.spin[indices], pool.max_spin[indices]
+    return np.where(max_spin != 0, np.minimum(spin, max_spin), spin)
@@ -0,0 +1,277 @@
+"""A struct of arrays pool of bullets, updated in bulk.
+
+Every `Bullet` is a sprite with its own `POMS` and its own `MutatorStack`,
+and every mutator is called one by one, every frame.  With thousands of
+bullets, that's tens of thousands of Python calls per frame.
+
+The `BulletPool` keeps the `POMS` values of all its bullets in NumPy arrays
+instead, and runs every mutator once for the whole pool, through its
+`Mutator.apply_batch` method.
+"""
+
+import glm
+import numpy as np
+
+from patternengine.poms import POMS, MomentumMutator, MutatorStack
+
+__all__ = ['BulletPool']
+
+
+class BulletPool:
+    """A pool of bullets, stored as struct of arrays.
+
+    :param capacity: Optional, the number of bullets to preallocate room for.
+    :param mutators: Optional, the mutators to run on all bullets, in that
+        order.  Either mutator instances, or classes with a ``classmethod``
+        `Mutator.apply_batch`.
+    :param world: Optional, a `pygame.Rect` for the `WorldMutator`.
+    :raises ValueError: For a mutator class that needs an instance.
+
+    The pool stores the `position`, `momentum`, `orientation`, `spin`,
+    `max_speed` and `max_spin` of a `POMS`, and the `acceleration` for the
+    `AccelerationMutator`, for every bullet.  The attributes are views of
+    the rows in use, e.g. ``pool.position`` is a ``(len(pool), 2)`` array.
+
+    ``pool.update(dt)`` calls ``mutator.apply_batch(dt, pool, indices)`` of
+    every mutator once.  These mutators are vectorized, with the same
+    semantics as their per bullet counterparts:
+
+    * `MomentumMutator`
+    * `SpinMutator`
+    * `TurnMutator`
+    * `AccelerationMutator`, by the `acceleration` of every bullet, or of
+      the mutator instance
+    * `AlignWithMomentumMutator`
+    * `WorldMutator`, killing all bullets outside of `world`, or of the
+      world of the mutator instance
+    * `IntegratorMutator` instances
+
+    Instances of all other mutators are called once per bullet, with a stand
+    in parent, see `bullets`.
+
+    Bullets are added with `spawn`, and removed with `remove`.  Removing
+    moves the last bullets into the gaps, so the arrays stay contiguous, but
+    the index of a bullet can change.  Mutators `kill` bullets instead,
+    which removes them at the end of the update.
+
+    To fill the pool from a `Factory`, pass ``pool.batch_factory(speed)`` as
+    its batch factory.  The pool grows if it's full.
+    """
+
+    _fields = ('_position', '_momentum', '_orientation', '_spin', '_max_speed', '_max_spin',
+               '_acceleration')
+
+    def __init__(self, capacity=1024, mutators=(MomentumMutator,), world=None):
+        for mutator in mutators:
+            if isinstance(mutator, type) and getattr(mutator.apply_batch, '__self__', None) is None:
+                raise ValueError(f'{mutator.__name__} runs per bullet, pass an instance')
+
+        self.count = 0
+        self.mutators = tuple(mutators)
+        self.world = world
+        self._dead = []
+        self._bullet = None
+        self._allocate(capacity)
+
+    def __len__(self):
+        return self.count
+
+    def _allocate(self, capacity):
+        self._position = np.empty((capacity, 2))
+        self._momentum = np.empty((capacity, 2))
+        self._orientation = np.empty(capacity)
+        self._spin = np.empty(capacity)
+        self._max_speed = np.empty(capacity)
+        self._max_spin = np.empty(capacity)
+        self._acceleration = np.empty((capacity, 2))
+
+    def reserve(self, n):
+        """Make room for `n` more bullets."""
+        capacity = len(self._position)
+        if self.count + n <= capacity:
+            return
+
+        old = {name: getattr(self, name)[:self.count] for name in self._fields}
+        self._allocate(max(self.count + n, 2 * capacity))
+        for name, values in old.items():
+            getattr(self, name)[:self.count] = values
+
+    @property
+    def position(self):
+        return self._position[:self.count]
+
+    @property
+    def momentum(self):
+        return self._momentum[:self.count]
+
+    @property
+    def orientation(self):
+        return self._orientation[:self.count]
+
+    @property
+    def spin(self):
+        return self._spin[:self.count]
+
+    @property
+    def max_speed(self):
+        return self._max_speed[:self.count]
+
+    @property
+    def max_spin(self):
+        return self._max_spin[:self.count]
+
+    @property
+    def acceleration(self):
+        return self._acceleration[:self.count]
+
+    def spawn(self, position, momentum, orientation=0, spin=0, max_speed=0, max_spin=0,
+              acceleration=(0, 0)):
+        """Add bullets to the pool.
+
+        :param position: A ``(n, 2)`` array or sequence of positions.
+        :param momentum: A ``(n, 2)`` array or sequence of momenta.
+
+        The other parameters are either a single value for all new bullets,
+        or a value per bullet.  Returns the slice of the new bullets.
+        """
+        n = len(position)
+        self.reserve(n)
+
+        rows = slice(self.count, self.count + n)
+        self._position[rows] = position
+        self._momentum[rows] = momentum
+        self._orientation[rows] = orientation
+        self._spin[rows] = spin
+        self._max_speed[rows] = max_speed
+        self._max_spin[rows] = max_spin
+        self._acceleration[rows] = acceleration
+        self.count += n
+
+        return rows
+
+    def remove(self, dead):
+        """Remove bullets from the pool.
+
+        :param dead: A boolean mask, or an array of indices of the bullets
+            to remove.
+
+        The last bullets of the pool are moved into the gaps.
+        """
+        dead_mask = np.zeros(self.count, dtype=bool)
+        dead_mask[dead] = True
+        if not (dead_count := np.count_nonzero(dead_mask)):
+            return
+
+        count = self.count - dead_count
+        holes = np.flatnonzero(dead_mask[:count])
+        movers = np.flatnonzero(~dead_mask[count:]) + count
+        for name in self._fields:
+            a = getattr(self, name)
+            a[holes] = a[movers]
+        self.count = count
+
+    def kill(self, dead):
+        """Remove bullets at the end of the current update.
+
+        :param dead: An index, or an array of indices of the bullets.
+
+        Until then, the indices of all bullets stay the same.
+        """
+        self._dead.append(dead)
+
+    def update(self, dt):
+        """Run all mutators on all bullets, then remove the killed ones."""
+        if not self.count:
+            return
+
+        indices = slice(0, self.count)
+        for mutator in self.mutators:
+            mutator.apply_batch(dt, self, indices)
+
+        if self._dead:
+            dead, self._dead = self._dead, []
+            self.remove(np.concatenate([np.atleast_1d(d) for d in dead]).astype(int))
+
+    def bullets(self, indices=None):
+        """Iterate over stand in bullets for per bullet mutators.
+
+        :param indices: Optional, a slice or an index array of the bullets.
+            Defaults to all bullets.
+
+        The stand in has a ``poms``, the ``mutators`` of the pool and a
+        ``kill`` method, like a `Bullet`.  Its ``poms`` is read from the pool
+        for every bullet, and written back when the iteration moves on.
+
+        The same stand in is used for all bullets, don't keep a reference.
+        """
+        if self._bullet is None:
+            self._bullet = _PooledBullet(self)
+        bullet = self._bullet
+
+        if indices is None:
+            indices = slice(None)
+
+        for i in np.arange(self.count)[indices].tolist():
+            bullet.load(i)
+            yield bullet
+            bullet.store()
+
+    def batch_factory(self, speed=1, **kwargs):
+        """Return a batch factory for a `Factory` that spawns into the pool.
+
+        :param speed: The speed to scale the normalized momenta with.
+
+        All other keyword arguments are passed to `spawn`.  The factory
+        momentum is added to the momenta, and the bullets are moved ahead by
+        their delays.
+
+        The batch factory returns `None`, since the bullets of a pool have
+        no identity to track, so it can't be used with a `BulletBudget`.
+        """
+        def batch_factory(positions, momenta, factory_momentum=None, delays=None):
+            rows = self.spawn(positions, momenta, **kwargs)
+            momentum = self._momentum[rows]
+            momentum *= speed
+            if factory_momentum:
+                momentum += factory_momentum
+            if delays is not None and len(delays):
+                self._position[rows] += momentum * np.asarray(delays)[:, np.newaxis]
+
+        return batch_factory
+
+
+class _PooledBullet:
+    """A stand in for a `Bullet` in a `BulletPool`, for per bullet mutators."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.index = 0
+        self.poms = POMS((0, 0))
+        self.mutators = MutatorStack()
+        self._mutators = [m for m in pool.mutators if not isinstance(m, type)]
+
+    def load(self, i):
+        pool, poms = self.pool, self.poms
+        self.index = i
+        poms.position = glm.vec2(pool._position[i].tolist())
+        poms.momentum = glm.vec2(pool._momentum[i].tolist())
+        poms.orientation = float(pool._orientation[i])
+        poms.spin = float(pool._spin[i])
+        poms.max_speed = float(pool._max_speed[i])
+        poms.max_spin = float(pool._max_spin[i])
+
+        # Killing mutators clear the stack of their parent
+        if len(self.mutators) != len(self._mutators):
+            self.mutators.add(self._mutators)
+
+    def store(self):
+        pool, poms, i = self.pool, self.poms, self.index
+        pool._position[i] = poms.position
+        pool._momentum[i] = poms.momentum
+        pool._orientation[i] = poms.orientation
+        pool._spin[i] = poms.spin
+        pool._max_speed[i] = poms.max_speed
+        pool._max_spin[i] = poms.max_spin
+
+    def kill(self):
+        self.pool.kill(self.index)
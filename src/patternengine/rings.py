@@ -1,16 +1,22 @@
 from collections.abc import Iterator, Sequence
-from itertools import chain, cycle
+from functools import lru_cache
+from itertools import chain
+from math import cos, radians, sin
 from random import random
-from typing import Callable
+from typing import Callable, NamedTuple
 
 import glm
+import numpy as np
+import pygame
 
 from glm import vec2
 
 
 type Emit = tuple[vec2, vec2]
 type EmitSource = Iterator[Emit]
+type Batch = tuple[np.ndarray, np.ndarray]
 type Vector = glm.vec2 | Sequence[float, float]
+type Seed = int | np.random.SeedSequence | np.random.Generator | None
 
 
 class Ring:
@@ -24,13 +30,31 @@ class Ring:
         represented by ``#``, all other characters are considered *off*.
     :param randomize: If ``randomize`` is set, ``steps`` is ignored and coordinates are chosen randomly from the ring.
     :param rng: Alternative random function
+    :param seed: Optional seed for a NumPy random ``Generator``
 
     The rng is assumed to have the following prototype::
 
         def rng() -> float  # in the range 0 - 1
 
+    If a ``seed`` is given, ``randomize`` and ``jitter`` draw their values
+    from a private ``numpy.random.Generator`` instead, which makes the
+    emitted pattern reproducible and fetches all random values of a
+    ``take(n)`` in a single call.  The seed can be anything
+    ``numpy.random.default_rng`` accepts, e.g. an ``int``, or one of the
+    children of ``numpy.random.SeedSequence(...).spawn(n)`` to give several
+    emitters independent streams.
+
+    Unless ``randomize`` or ``jitter`` are used, the emits of a ring only
+    depend on ``radius``, ``aim``, ``width`` and ``segments``.  They are
+    precomputed into a table once, which is shared by all rings with the same
+    configuration.  Changing any of these attributes, or ``steps``, at
+    runtime is fine, e.g. to animate the ``width`` from a ``LerpThing``.  The
+    table is then looked up again on the next emit, and the ring continues
+    from its current position in the cycle.
+
     .. note:: "Rings" are not intended to be used directly, but if you do, you
-       get values out of it using ``next(ring)``.
+       get values out of it using ``next(ring)``, or ``ring.take(n)`` for a
+       batch of ``n`` emits as NumPy arrays.
     """
 
     def __init__(self,
@@ -40,16 +64,75 @@ class Ring:
                  width: float = 360,
                  randomize: bool = False,
                  steps: str = '#',
-                 jitter: float = 0) -> None:
+                 jitter: float = 0,
+                 seed: Seed = None) -> None:
+        self._table = None
+        self._arc_phase = 0
+        self._step_phase = 0
+
         self.radius = radius
         self.segments = segments
         self.aim = aim
         self.width = width
         self.randomize = randomize
-        self.steps = cycle(steps)
+        self.steps = steps
         self.jitter = jitter
-
-        self.arc = _arc_cycle(self.width, self.segments)
+        self.generator = _generator(seed)
+        self._rng = random if self.generator is None else self.generator.random
+
+    @property
+    def radius(self) -> float:
+        return self._radius
+
+    @radius.setter
+    def radius(self, radius: float) -> None:
+        self._radius = radius
+        self._table = None
+
+    @property
+    def steps(self) -> str:
+        return self._steps
+
+    @steps.setter
+    def steps(self, steps: str) -> None:
+        self._steps = steps
+        self._mask = _steps_mask(steps)
+        self._step_phase %= len(steps)
+
+    @property
+    def segments(self) -> int:
+        return self._segments
+
+    @segments.setter
+    def segments(self, segments: int) -> None:
+        self._segments = segments
+        self._arc_phase %= segments
+        self._table = None
+
+    @property
+    def aim(self) -> float:
+        return self._aim
+
+    @aim.setter
+    def aim(self, aim: float) -> None:
+        self._aim = aim
+        self._table = None
+
+    @property
+    def width(self) -> float:
+        return self._width
+
+    @width.setter
+    def width(self, width: float) -> None:
+        self._width = width
+        self._table = None
+
+    def _lookup_table(self) -> '_RingTable':
+        """Return the precomputed emits for the current configuration."""
+
+        if self._table is None:
+            self._table = _ring_table(self._radius, self._aim, self._width, self._segments)
+        return self._table
 
     def __iter__(self) -> Iterator[Emit]:
         return self
@@ -58,28 +141,82 @@ class Ring:
         """Return the next position and momentum"""
 
         if self.randomize:
-            phi = random() * self.width - self.width / 2
+            phi = self._rng() * self.width - self.width / 2
         else:
-            phi = next(self.arc)
-            if next(self.steps) != '#':
+            i = self._arc_phase
+            step = self.steps[self._step_phase]
+            self._arc_phase = (i + 1) % self._segments
+            self._step_phase = (self._step_phase + 1) % len(self.steps)
+            if step != '#':
                 return None
 
+            if not self.jitter:
+                offset, momentum = self._lookup_table().emits[i]
+                return vec2(offset), vec2(momentum)
+
+            phi = self._lookup_table().angles[i]
+
         angle = phi + self.aim
 
         if self.jitter:
-            jitter = random() * self.jitter - self.jitter / 2
+            jitter = self._rng() * self.jitter - self.jitter / 2
             angle += jitter
         rad = glm.radians(angle)
         v = glm.rotate(vec2(1, 0), rad)
 
         return v * self.radius, v
 
+    def take(self, n: int, out: Batch | None = None) -> Batch:
+        """Return the next ``n`` emits as ``(k, 2)`` offset and momentum arrays.
+
+        This consumes ``n`` slots exactly like ``n`` calls to ``next(ring)``,
+        but slots that are *off* in ``steps`` are dropped instead of being
+        returned as ``None``, so ``k <= n``.
+
+        If ``out`` is given, a pair of ``(n, 2)`` arrays, the emits are
+        written into its first ``k`` rows and views of these are returned.
+        This is the same for all rings.
+        """
+
+        if self.randomize:
+            draws = _draws(self._rng, 2 * n if self.jitter else n, self.generator)
+            if self.jitter:
+                phi, jitter = draws[0::2], draws[1::2]
+            else:
+                phi, jitter = draws, None
+            phi = phi * self.width - self.width / 2
+        else:
+            idx = _arc_slots(self._steps, self._step_phase, self._arc_phase, self._segments, n)
+            self._arc_phase = (self._arc_phase + n) % self._segments
+            self._step_phase = (self._step_phase + n) % len(self.steps)
+
+            table = self._lookup_table()
+            if not self.jitter:
+                return _gather(table.offsets, table.momenta, idx, out)
+
+            phi = table.angle_array[idx]
+            jitter = _draws(self._rng, len(phi), self.generator)
+
+        angle = phi + self.aim
+        if jitter is not None:
+            angle += jitter * self.jitter - self.jitter / 2
+
+        momentum = _unit(angle)
+
+        return _into((momentum * self.radius, momentum), out)
+
+    def count(self, n: int) -> int:
+        """Return the number of bullets the next ``n`` slots will produce."""
+
+        return n if self.randomize else _count_on(self._mask, self._step_phase, n)
+
 
 class Disk:
     """A generator for emits from a circular area.
 
     :param radius: The radius of the emit disk
     :param rng: Alternative random function
+    :param seed: Optional seed for a NumPy random ``Generator``, replaces ``rng``
 
     The position will be a random point within the defined disk.  The
     momentum will be a normalized vector from the origin ``(0, 0)`` towards
@@ -89,6 +226,8 @@ class Disk:
 
         def rng(radius: float) -> vec2  # returns normalized vector
 
+    See :class:`patternengine.Ring` for the ``seed``.
+
     .. note:: Use :func:`patternengine.Ring` if you want control over the
        direction and arc of the emitted particles.
 
@@ -98,9 +237,11 @@ class Disk:
 
     def __init__(self,
                  radius: float = 1,
-                 rng: Callable[[float], vec2] = glm.diskRand) -> None:
+                 rng: Callable[[float], vec2] = glm.diskRand,
+                 seed: Seed = None) -> None:
         self.radius = radius
         self.rng = rng
+        self.generator = _generator(seed)
 
     def __iter__(self) -> Iterator[Emit]:
         return self
@@ -108,11 +249,28 @@ class Disk:
     def __next__(self) -> Emit:
         """Return the next position and momentum"""
 
+        if self.generator is not None:
+            return _first(self.take(1))
+
         pos = self.rng(self.radius)
         momentum = glm.normalize(pos)
 
         return pos, momentum
 
+    def take(self, n: int, out: Batch | None = None) -> Batch:
+        """Return the next ``n`` emits as ``(n, 2)`` offset and momentum arrays."""
+
+        if self.generator is not None:
+            r, phi = self.generator.random((2, n))
+            momentum = _unit(phi * 360)
+            return _into((momentum * (self.radius * np.sqrt(r))[:, np.newaxis], momentum), out)
+
+        pos = np.array([self.rng(self.radius) for _ in range(n)], dtype=float).reshape(n, 2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            momentum = pos / np.linalg.norm(pos, axis=1, keepdims=True)
+
+        return _into((pos, momentum), out)
+
 
 def _segmentalize_range(length: float, segments: int) -> float:
     """Return a cycle over ``segments`` points on range 0-1."""
@@ -133,11 +291,18 @@ class Line:
     :param rng: Alternative random function
     :param emit_angle: The direction of the momentum
     :param repeat: 0: cycle, 1: bounce back & forth
+    :param seed: Optional seed for a NumPy random ``Generator``, replaces ``rng``
 
     The rng is assumed to have the following prototype::
 
         def rng() -> float  # in the range 0 - 1
 
+    See :class:`patternengine.Ring` for the ``seed``.
+
+    ``angle``, ``length``, ``anchor`` and ``emit_angle`` can be changed at
+    runtime.  The direction, start point and momentum of the line are
+    cached and only recalculated after one of them changed.
+
     .. note:: "Rings" are not intended to be used directly, but if you do, you
        get values out of it using ``next(ring)``.
     """
@@ -150,19 +315,78 @@ class Line:
                  randomize: bool = False,
                  rng: Callable = random,
                  emit_angle: float = 90,
-                 repeat: int = 0) -> None:
+                 repeat: int = 0,
+                 seed: Seed = None) -> None:
+        self._basis = None
         self.angle = angle
         self.length = length
         self.anchor = anchor
         self.randomize = randomize
-        self.rng = rng
+        self.generator = _generator(seed)
+        self.rng = rng if self.generator is None else self.generator.random
         self.emit_angle = emit_angle
 
         line_steps = _segmentalize_range(self.length, steps)
         if repeat == 0:
-            self.cycle = cycle(line_steps)
+            self._line_steps = line_steps
         elif repeat == 1:
-            self.cycle = cycle(chain(line_steps, line_steps[-2:0:-1]))
+            self._line_steps = list(chain(line_steps, line_steps[-2:0:-1]))
+        self._line_steps_array = np.array(self._line_steps)
+        self._phase = 0
+
+    @property
+    def angle(self) -> float:
+        return self._angle
+
+    @angle.setter
+    def angle(self, angle: float) -> None:
+        self._angle = angle
+        self._basis = None
+
+    @property
+    def length(self) -> float:
+        return self._length
+
+    @length.setter
+    def length(self, length: float) -> None:
+        self._length = length
+        self._basis = None
+
+    @property
+    def anchor(self) -> float:
+        return self._anchor
+
+    @anchor.setter
+    def anchor(self, anchor: float) -> None:
+        self._anchor = anchor
+        self._basis = None
+
+    @property
+    def emit_angle(self) -> float:
+        return self._emit_angle
+
+    @emit_angle.setter
+    def emit_angle(self, emit_angle: float) -> None:
+        self._emit_angle = emit_angle
+        self._basis = None
+
+    def _lookup_basis(self) -> '_LineBasis':
+        """Return the cached start, span and momentum of the line."""
+
+        if self._basis is None:
+            rad = glm.radians(self._angle)
+            emit_rad = glm.radians(self._emit_angle)
+
+            direction = glm.rotate(vec2(1, 0), rad)
+            momentum = glm.rotate(direction, emit_rad)
+            start = -direction * self._length * self._anchor
+            span = direction * self._length
+
+            self._basis = _LineBasis(start, span, momentum,
+                                     np.array(start, dtype=float), np.array(span, dtype=float),
+                                     np.array(momentum, dtype=float))
+
+        return self._basis
 
     def __iter__(self) -> Iterator[Emit]:
         return self
@@ -170,27 +394,212 @@ class Line:
     def __next__(self) -> Emit:
         """Return the next position and momentum"""
 
-        # Don't cache calculated values, since angle, anchor, length, and
-        # emit_angle can change during runtime!
-        rad = glm.radians(self.angle)
-        emit_rad = glm.radians(self.emit_angle)
+        basis = self._lookup_basis()
+        if self.randomize:
+            pos = basis.start + basis.span * self.rng()
+        else:
+            pos = basis.start + basis.span * self._line_steps[self._phase]
+            self._phase = (self._phase + 1) % len(self._line_steps)
 
-        direction = glm.rotate(vec2(1, 0), rad)
-        momentum = glm.rotate(direction, emit_rad)
+        return pos, vec2(basis.momentum)
 
-        start = -direction * self.length * self.anchor
+    def take(self, n: int, out: Batch | None = None) -> Batch:
+        """Return the next ``n`` emits as ``(n, 2)`` offset and momentum arrays."""
+
+        basis = self._lookup_basis()
         if self.randomize:
-            pos = start + self.length * direction * self.rng()
+            t = _draws(self.rng, n, self.generator)
         else:
-            pos = start + self.length * direction * next(self.cycle)
+            t = self._line_steps_array[(self._phase + np.arange(n)) % len(self._line_steps)]
+            self._phase = (self._phase + n) % len(self._line_steps)
 
-        return pos, momentum
+        pos = basis.start_array + t[:, np.newaxis] * basis.span_array
+
+        if out is None:
+            return pos, np.tile(basis.momentum_array, (n, 1))
+
+        out[1][:n] = basis.momentum_array
+        return _into((pos, out[1][:n]), out)
+
+
+class Path:
+    """A generator for emits along a polyline or a chain of Bézier curves.
+
+    :param points: The vertices of the polyline, or the control points of
+        the Bézier curves if ``bezier`` is set.
+    :param segments: The number of points on the path (including both ends)
+    :param bezier: Interpret ``points`` as cubic Bézier curves
+    :param emit_angle: The direction of the momentum, relative to the
+        direction of the path.  The default of 90 emits along the normal,
+        0 along the tangent.
+    :param randomize: Return random positions on the path instead of fixed steps
+    :param steps: A pattern that describes which segment to emit, see
+        :class:`patternengine.Ring`
+    :param rng: Alternative random function
+    :param seed: Optional seed for a NumPy random ``Generator``, replaces ``rng``
+    :param resolution: The number of samples per Bézier curve
+
+    Cubic Bézier curves are chained, the end point of one curve being the
+    start point of the next one, so ``points`` is expected to have
+    ``3 * curves + 1`` entries::
+
+        start, control, control, end/start, control, control, end, ...
+
+    Like with the other rings, the path is positioned around the origin
+    ``(0, 0)``, and the emitter position needs to be added to it.
+
+    The path is sampled into a table of arc lengths once at construction.
+    The ``segments`` emit positions are spaced evenly by arc length and also
+    precomputed, and recomputed when ``segments`` or ``emit_angle`` change.
+    Random positions are looked up from the table by a binary
+    search.  Emits along a curve cost no more than those of a ``Ring``.
+
+    The rng is assumed to have the following prototype::
+
+        def rng() -> float  # in the range 0 - 1
+
+    .. note:: "Rings" are not intended to be used directly, but if you do, you
+       get values out of it using ``next(ring)``, or ``ring.take(n)`` for a
+       batch of ``n`` emits as NumPy arrays.
+    """
+
+    def __init__(self,
+                 points: Sequence[Vector],
+                 segments: int = 2,
+                 bezier: bool = False,
+                 emit_angle: float = 90,
+                 randomize: bool = False,
+                 steps: str = '#',
+                 rng: Callable = random,
+                 seed: Seed = None,
+                 resolution: int = 32) -> None:
+        vertices = np.array(points, dtype=float).reshape(-1, 2)
+        if bezier:
+            vertices = _bezier_polyline(vertices, resolution)
+
+        # Drop zero length edges, they have no direction
+        keep = np.ones(len(vertices), dtype=bool)
+        keep[1:] = np.any(np.diff(vertices, axis=0), axis=1)
+        self.vertices = vertices[keep]
+        if len(self.vertices) < 2:
+            raise ValueError('A Path needs at least 2 distinct points')
+
+        edges = np.diff(self.vertices, axis=0)
+        lengths = np.linalg.norm(edges, axis=1)
+        self.arc_lengths = np.concatenate(((0,), np.cumsum(lengths)))
+        self.length = self.arc_lengths[-1]
+
+        self._edges = edges
+        self._directions = edges / lengths[:, np.newaxis]
+
+        self.randomize = randomize
+        self.generator = _generator(seed)
+        self.rng = rng if self.generator is None else self.generator.random
+
+        self._phase = 0
+        self._step_phase = 0
+        self._segments = segments
+        self._emit_angle = emit_angle
+        self._build_table()
+        self.steps = steps
+
+    @property
+    def segments(self) -> int:
+        return self._segments
+
+    @segments.setter
+    def segments(self, segments: int) -> None:
+        self._segments = segments
+        self._phase %= segments
+        self._build_table()
+
+    @property
+    def emit_angle(self) -> float:
+        return self._emit_angle
+
+    @emit_angle.setter
+    def emit_angle(self, emit_angle: float) -> None:
+        self._emit_angle = emit_angle
+        self._build_table()
+
+    def _build_table(self) -> None:
+        """Precompute the momenta of the edges and the emits of the segments."""
+        self._momenta = self._directions @ _rotation(self._emit_angle).T
+
+        distances = self.length * np.array(_segmentalize_range(self.length, self._segments))
+        self._offsets, self._table_momenta = self.at(distances)
+        self._emits = tuple((vec2(o), vec2(m)) for o, m in zip(self._offsets.tolist(),
+                                                              self._table_momenta.tolist()))
+
+    @property
+    def steps(self) -> str:
+        return self._steps
+
+    @steps.setter
+    def steps(self, steps: str) -> None:
+        self._steps = steps
+        self._mask = _steps_mask(steps)
+        self._step_phase %= len(steps)
+
+    def at(self, distances: np.ndarray) -> Batch:
+        """Return positions and momenta at the given arc lengths along the path."""
+
+        distances = np.clip(distances, 0, self.length)
+        idx = np.searchsorted(self.arc_lengths, distances, side='right') - 1
+        idx = np.minimum(idx, len(self._edges) - 1)
+
+        t = (distances - self.arc_lengths[idx]) / (self.arc_lengths[idx + 1] - self.arc_lengths[idx])
+        positions = self.vertices[idx] + t[:, np.newaxis] * self._edges[idx]
+
+        return positions, self._momenta[idx]
+
+    def __iter__(self) -> Iterator[Emit]:
+        return self
+
+    def __next__(self) -> Emit | None:
+        """Return the next position and momentum"""
+
+        if self.randomize:
+            return _first(self.at(np.array((self.rng() * self.length,))))
+
+        i = self._phase
+        step = self._steps[self._step_phase]
+        self._phase = (i + 1) % self._segments
+        self._step_phase = (self._step_phase + 1) % len(self._steps)
+        if step != '#':
+            return None
+
+        offset, momentum = self._emits[i]
+        return vec2(offset), vec2(momentum)
+
+    def take(self, n: int, out: Batch | None = None) -> Batch:
+        """Return the next ``n`` emits as ``(k, 2)`` offset and momentum arrays.
+
+        See :meth:`patternengine.Ring.take`.
+        """
+
+        if self.randomize:
+            return _into(self.at(_draws(self.rng, n, self.generator) * self.length), out)
+
+        idx = (self._phase + _on_slots(self._steps, self._step_phase, n)) % self._segments
+        self._phase = (self._phase + n) % self._segments
+        self._step_phase = (self._step_phase + n) % len(self._steps)
+
+        return _gather(self._offsets, self._table_momenta, idx, out)
+
+    def count(self, n: int) -> int:
+        """Return the number of bullets the next ``n`` slots will produce."""
+
+        return n if self.randomize else _count_on(self._mask, self._step_phase, n)
 
 
 class Point:
     """A generator for emits from a single point.
 
     :param angle: The angle towards which to emit bullets, random if ``None``
+    :param seed: Optional seed for a NumPy random ``Generator`` for random angles
+
+    See :class:`patternengine.Ring` for the ``seed``.
 
     Use a ``Ring`` with radius 0 if you need more complex control over the
     emit direction.
@@ -199,8 +608,9 @@ class Point:
        get values out of it using ``next(ring)``.
     """
 
-    def __init__(self, angle: float | None = None) -> None:
+    def __init__(self, angle: float | None = None, seed: Seed = None) -> None:
         self.angle = angle
+        self.generator = _generator(seed)
 
     def __iter__(self) -> Iterator[Emit]:
         return self
@@ -208,10 +618,29 @@ class Point:
     def __next__(self) -> Emit:
         """Return the next position and momentum"""
 
+        if self.angle is None and self.generator is not None:
+            return _first(self.take(1))
+
         momentum = glm.circularRand(1) if self.angle is None else glm.rotate(vec2(1, 0), glm.radians(self.angle))
 
         return vec2(0, 0), momentum
 
+    def take(self, n: int, out: Batch | None = None) -> Batch:
+        """Return the next ``n`` emits as ``(n, 2)`` offset and momentum arrays."""
+
+        if self.angle is None and self.generator is not None:
+            momentum = _unit(self.generator.random(n) * 360)
+        elif self.angle is None:
+            momentum = np.array([glm.circularRand(1) for _ in range(n)], dtype=float).reshape(n, 2)
+        else:
+            momentum = np.tile(_unit(self.angle), (n, 1))
+
+        if out is None:
+            return np.zeros((n, 2)), momentum
+
+        out[0][:n] = 0
+        return _into((out[0][:n], momentum), out)
+
 
 class Rectangle:
     """A generator for emits from a rectangular area.
@@ -219,6 +648,7 @@ class Rectangle:
     :param width: The width of the rectangle
     :param height: The height of the rectangle
     :param rng: Alternative random function
+    :param seed: Optional seed for a NumPy random ``Generator``, replaces ``rng``
 
     The rectangle will always have its center at ``(0, 0)``.
 
@@ -226,6 +656,8 @@ class Rectangle:
 
         def rng() -> float  # in the range 0 - 1
 
+    See :class:`patternengine.Ring` for the ``seed``.
+
     .. note:: "Rings" are not intended to be used directly, but if you do, you
        get values out of it using ``next(ring)``.
     """
@@ -233,10 +665,12 @@ class Rectangle:
     def __init__(self,
                  width: float,
                  height: float,
-                 rng: Callable = random) -> None:
+                 rng: Callable = random,
+                 seed: Seed = None) -> None:
         self.width = width
         self.height = height
-        self.rng = rng
+        self.generator = _generator(seed)
+        self.rng = rng if self.generator is None else self.generator.random
 
     def __iter__(self) -> Iterator[Emit]:
         return self
@@ -244,6 +678,9 @@ class Rectangle:
     def __next__(self) -> Emit:
         """Return the next position and momentum"""
 
+        if self.generator is not None:
+            return _first(self.take(1))
+
         pos = vec2(self.rng() * self.width - self.width / 2,
                    self.rng() * self.height - self.height / 2)
         angle = glm.atan2(pos.y, pos.x)
@@ -251,11 +688,343 @@ class Rectangle:
 
         return pos, momentum
 
+    def take(self, n: int, out: Batch | None = None) -> Batch:
+        """Return the next ``n`` emits as ``(n, 2)`` offset and momentum arrays."""
+
+        pos = _draws(self.rng, 2 * n, self.generator).reshape(n, 2) * (self.width, self.height)
+        pos -= (self.width / 2, self.height / 2)
+        angle = np.arctan2(pos[:, 1], pos[:, 0])
+        momentum = np.column_stack((np.cos(angle), np.sin(angle)))
+
+        return _into((pos, momentum), out)
+
 
-def _arc_cycle(arc: float, segments: int) -> float:
-    """Return a cycle over `segments` within `arc`."""
+class Silhouette:
+    """A generator for emits from the pixels of a mask or image.
+
+    :param source: A ``pygame.Mask``, or a ``pygame.Surface`` to create the
+        mask from.
+    :param threshold: The alpha threshold when creating the mask from a surface
+    :param scale: The scale factor from pixels to emit coordinates
+    :param outline: Only emit from the outline of the mask
+    :param normals: Emit along the outward normal of the mask's outline
+        instead of away from its center
+    :param randomize: Return random pixels instead of cycling through all of them
+    :param rng: Alternative random function
+    :param seed: Optional seed for a NumPy random ``Generator``, replaces ``rng``
+
+    Use this to let bullets form e.g. a logo or the silhouette of a boss.
+
+    The center of the mask is placed at ``(0, 0)``.  Without ``randomize``,
+    the silhouette cycles through its pixels row by row, so a
+    ``BulletSource`` emitting ``len(silhouette)`` bullets draws the whole
+    mask in one emit.
+
+    All candidate pixels, and their momenta, are collected into a table
+    once, so an emit is only a lookup, no matter the size of the mask.
+
+    The rng is assumed to have the following prototype::
+
+        def rng() -> float  # in the range 0 - 1
+
+    .. note:: "Rings" are not intended to be used directly, but if you do, you
+       get values out of it using ``next(ring)``, or ``ring.take(n)`` for a
+       batch of ``n`` emits as NumPy arrays.
+    """
+
+    def __init__(self,
+                 source: pygame.Mask | pygame.Surface,
+                 threshold: int = 127,
+                 scale: float = 1,
+                 outline: bool = False,
+                 normals: bool = False,
+                 randomize: bool = False,
+                 rng: Callable = random,
+                 seed: Seed = None) -> None:
+        if isinstance(source, pygame.Surface):
+            source = pygame.mask.from_surface(source, threshold)
+
+        # Index as [y, x], so the pixels are collected row by row
+        pixels = pygame.surfarray.array_red(source.to_surface()).T > 0
+        padded = np.pad(pixels, 1)
+        if outline:
+            inner = (padded[:-2, 1:-1] & padded[2:, 1:-1]
+                     & padded[1:-1, :-2] & padded[1:-1, 2:])
+            candidates = pixels & ~inner
+        else:
+            candidates = pixels
+
+        ys, xs = np.nonzero(candidates)
+        if not len(xs):
+            raise ValueError('The mask of a Silhouette has no pixels set')
+
+        h, w = pixels.shape
+        self.offsets = np.column_stack((xs + 0.5 - w / 2, ys + 0.5 - h / 2)) * scale
+
+        momenta = self.offsets.copy()
+        if normals:
+            # Sobel gradient of the mask, pointing outwards
+            f = padded.astype(float)
+            gx = ((f[:-2, :-2] + 2 * f[1:-1, :-2] + f[2:, :-2])
+                  - (f[:-2, 2:] + 2 * f[1:-1, 2:] + f[2:, 2:]))
+            gy = ((f[:-2, :-2] + 2 * f[:-2, 1:-1] + f[:-2, 2:])
+                  - (f[2:, :-2] + 2 * f[2:, 1:-1] + f[2:, 2:]))
+            gradient = np.column_stack((gx[ys, xs], gy[ys, xs]))
+            # Inside the mask there is no outline, keep the radial momentum
+            edge = np.any(gradient, axis=1)
+            momenta[edge] = gradient[edge]
+
+        lengths = np.linalg.norm(momenta, axis=1, keepdims=True)
+        self.momenta = np.divide(momenta, lengths, out=np.tile((1.0, 0.0), (len(xs), 1)),
+                                 where=lengths > 0)
+
+        for a in (self.offsets, self.momenta):
+            a.flags.writeable = False
+
+        self.randomize = randomize
+        self.generator = _generator(seed)
+        self.rng = rng if self.generator is None else self.generator.random
+        self._phase = 0
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __iter__(self) -> Iterator[Emit]:
+        return self
+
+    def __next__(self) -> Emit:
+        """Return the next position and momentum"""
+
+        if self.randomize:
+            i = min(int(self.rng() * len(self.offsets)), len(self.offsets) - 1)
+        else:
+            i = self._phase
+            self._phase = (i + 1) % len(self.offsets)
+
+        return vec2(self.offsets[i].tolist()), vec2(self.momenta[i].tolist())
+
+    def take(self, n: int, out: Batch | None = None) -> Batch:
+        """Return the next ``n`` emits as ``(n, 2)`` offset and momentum arrays."""
+
+        count = len(self.offsets)
+        if self.randomize:
+            idx = np.minimum((_draws(self.rng, n, self.generator) * count).astype(int), count - 1)
+        else:
+            idx = (self._phase + np.arange(n)) % count
+            self._phase = (self._phase + n) % count
+
+        return _gather(self.offsets, self.momenta, idx, out)
+
+
+def _bezier_polyline(points: np.ndarray, resolution: int) -> np.ndarray:
+    """Sample a chain of cubic Bézier curves into a polyline."""
+
+    curves = (len(points) - 1) // 3
+    if curves < 1 or len(points) != 3 * curves + 1:
+        raise ValueError('Bézier paths need 3 * curves + 1 points')
+
+    t = np.linspace(0, 1, resolution + 1)[:, np.newaxis]
+    basis = np.hstack(((1 - t) ** 3, 3 * (1 - t) ** 2 * t, 3 * (1 - t) * t ** 2, t ** 3))
+
+    controls = np.stack([points[3 * i:3 * i + 4] for i in range(curves)])
+    samples = basis @ controls
+
+    # Curves share their end points, skip the duplicates
+    return np.concatenate((samples[0], samples[1:, 1:].reshape(-1, 2)))
+
+
+def _arc_table(arc: float, segments: int) -> list[float]:
+    """Return the angles of `segments` within `arc`."""
 
     step = 1 / segments if (arc == 360 or segments == 1) else 1 / (segments - 1)
 
     recenter = 0 if arc == 360 else arc / 2
-    return cycle([step * arc * i - recenter for i in range(segments)])
+    return [step * arc * i - recenter for i in range(segments)]
+
+
+class _LineBasis(NamedTuple):
+    """The cached geometry of a ``Line``."""
+
+    start: vec2
+    span: vec2
+    momentum: vec2
+    start_array: np.ndarray
+    span_array: np.ndarray
+    momentum_array: np.ndarray
+
+
+class _RingTable(NamedTuple):
+    """Precomputed emits of a deterministic ``Ring``."""
+
+    angles: tuple[float, ...]
+    angle_array: np.ndarray
+    offsets: np.ndarray
+    momenta: np.ndarray
+    emits: tuple[Emit, ...]
+
+
+@lru_cache(maxsize=256)
+def _ring_table(radius: float, aim: float, width: float, segments: int) -> _RingTable:
+    """Return the shared emit table for a ring configuration."""
+
+    angles = _arc_table(width, segments)
+    angle_array = np.array(angles)
+    momenta = _unit(angle_array + aim)
+    offsets = momenta * radius
+    for a in (angle_array, momenta, offsets):
+        a.flags.writeable = False
+
+    emits = tuple((vec2(o), vec2(m)) for o, m in zip(offsets.tolist(), momenta.tolist()))
+
+    return _RingTable(tuple(angles), angle_array, offsets, momenta, emits)
+
+
+class _StepsMask(NamedTuple):
+    """A ``steps`` pattern, compiled for every phase of its cycle.
+
+    Row ``p`` of ``on`` holds the offsets of the *on* slots, counted from
+    phase ``p``.  ``counts[p, i]`` is the number of *on* slots among the
+    first ``i`` slots from phase ``p``.
+    """
+
+    on: np.ndarray
+    counts: np.ndarray
+
+
+@lru_cache(maxsize=256)
+def _steps_mask(steps: str) -> _StepsMask:
+    """Compile a ``steps`` pattern into a ``_StepsMask``."""
+
+    period = len(steps)
+    mask = np.array([c == '#' for c in steps])
+    phases = (np.arange(period)[:, np.newaxis] + np.arange(period)) % period
+
+    rolled = mask[phases]
+    on = np.sort(np.nonzero(rolled)[1].reshape(period, -1), axis=1)
+    counts = np.zeros((period, period + 1), dtype=int)
+    np.cumsum(rolled, axis=1, out=counts[:, 1:])
+    for a in (on, counts):
+        a.flags.writeable = False
+
+    return _StepsMask(on, counts)
+
+
+def _count_on(mask: _StepsMask, phase: int, n: int) -> int:
+    """Return the number of *on* slots within ``n`` slots from ``phase``."""
+
+    full, rem = divmod(n, len(mask.counts))
+
+    return full * mask.on.shape[1] + int(mask.counts[phase, rem])
+
+
+@lru_cache(maxsize=1024)
+def _on_slots(steps: str, phase: int, n: int) -> np.ndarray:
+    """Return the indices of the *on* slots within ``n`` slots from ``phase``."""
+
+    mask = _steps_mask(steps)
+    period = len(steps)
+    full, rem = divmod(n, period)
+    on = mask.on[phase]
+    tail = on[:mask.counts[phase, rem]]
+
+    slots = (np.arange(full)[:, np.newaxis] * period + on).ravel()
+    slots = np.concatenate((slots, tail + full * period))
+    slots.flags.writeable = False
+
+    return slots
+
+
+@lru_cache(maxsize=1024)
+def _arc_slots(steps: str, step_phase: int, arc_phase: int, segments: int, n: int) -> np.ndarray:
+    """Return the arc table indices of the *on* slots within the next ``n`` slots."""
+
+    idx = (arc_phase + _on_slots(steps, step_phase, n)) % segments
+    idx.flags.writeable = False
+
+    return idx
+
+
+def _generator(seed: Seed) -> np.random.Generator | None:
+    """Return a NumPy random generator for `seed`, or None without a seed."""
+
+    return None if seed is None else np.random.default_rng(seed)
+
+
+def _draws(rng: Callable, n: int, generator: np.random.Generator | None = None) -> np.ndarray:
+    """Return an array of `n` values from `rng()`, in call order.
+
+    With a `generator`, all values are drawn in a single call.
+    """
+
+    if generator is not None:
+        return generator.random(n)
+
+    return np.fromiter((rng() for _ in range(n)), dtype=float, count=n)
+
+
+def _take(ring: EmitSource, n: int, out: Batch | None = None) -> Batch:
+    """Return ``n`` slots of any ring as a batch.
+
+    Rings without a ``take`` method are iterated, blanks are dropped.
+    """
+
+    if hasattr(ring, 'take'):
+        return ring.take(n) if out is None else ring.take(n, out=out)
+
+    emits = [e for e in (next(ring) for _ in range(n)) if e]
+    if not emits:
+        return _into((np.empty((0, 2)), np.empty((0, 2))), out)
+
+    batch = np.array(emits, dtype=float)
+    return _into((batch[:, 0], batch[:, 1]), out)
+
+
+def _into(batch: Batch, out: Batch | None) -> Batch:
+    """Copy a batch into ``out`` and return views of the written rows."""
+
+    if out is None:
+        return batch
+
+    offsets, momenta = batch
+    k = len(offsets)
+    out[0][:k] = offsets
+    out[1][:k] = momenta
+
+    return out[0][:k], out[1][:k]
+
+
+def _gather(offsets: np.ndarray, momenta: np.ndarray, idx: np.ndarray, out: Batch | None) -> Batch:
+    """Return the rows ``idx`` of a table, gathered into ``out`` if given."""
+
+    if out is None:
+        return offsets[idx], momenta[idx]
+
+    k = len(idx)
+    return (np.take(offsets, idx, axis=0, out=out[0][:k]),
+            np.take(momenta, idx, axis=0, out=out[1][:k]))
+
+
+def _rotation(degrees: float) -> np.ndarray:
+    """Return the 2x2 matrix rotating vectors by `degrees`.
+
+    Not cached, aims and orientations change continuously.
+    """
+
+    rad = radians(degrees)
+    c, s = cos(rad), sin(rad)
+
+    return np.array(((c, -s), (s, c)))
+
+
+def _first(batch: Batch) -> Emit:
+    """Return the first emit of a batch as vectors."""
+
+    offsets, momenta = batch
+    return vec2(offsets[0].tolist()), vec2(momenta[0].tolist())
+
+
+def _unit(degrees: float | np.ndarray) -> np.ndarray:
+    """Return the unit vector(s) for the angle(s) `degrees`."""
+
+    rad = np.radians(degrees)
+    return np.stack((np.cos(rad), np.sin(rad)), axis=-1)
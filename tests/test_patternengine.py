@@ -1,11 +1,23 @@
 import glm
+import numpy as np
+import pygame
 import pytest  # noqa: F401
+import tracemalloc
 import patternengine as pe
 
+from random import seed
 from time import sleep
 from pytest import approx
 
 
+def assert_same_emits(a, b):
+    """Assert that two sequences of ``(offset, momentum)`` pairs are the same."""
+    assert len(a) == len(b)
+    for (o0, m0), (o1, m1) in zip(a, b):
+        assert approx(tuple(o0), abs=0.001) == tuple(o1)
+        assert approx(tuple(m0), abs=0.001) == tuple(m1)
+
+
 def test_ring_circle():
     r = pe.Ring(100, 4)
     v = next(r)[0]
@@ -65,6 +77,871 @@ def test_bullet_source():
     assert len(lst) == 4
 
 
+def test_ring_take():
+    r0 = pe.Ring(100, 5, width=90, steps='##.', jitter=10)
+    r1 = pe.Ring(100, 5, width=90, steps='##.', jitter=10)
+
+    seed(42)
+    expected = [e for e in (next(r0) for _ in range(11)) if e]
+    seed(42)
+    offsets, momenta = r1.take(11)
+
+    assert offsets.shape == momenta.shape == (len(expected), 2)
+    assert_same_emits(expected, list(zip(offsets, momenta)))
+
+    # Scalar and batch path share the cycle phase
+    assert next(r0) is None and next(r1) is None
+
+
+def test_emitters_take():
+    for e0, e1 in ((pe.Line(45, 100, steps=4, repeat=1), pe.Line(45, 100, steps=4, repeat=1)),
+                   (pe.Point(30), pe.Point(30)),
+                   (pe.Rectangle(20, 10), pe.Rectangle(20, 10))):
+        seed(23)
+        expected = [next(e0) for _ in range(7)]
+        seed(23)
+        offsets, momenta = e1.take(7)
+
+        assert offsets.shape == momenta.shape == (7, 2)
+        assert_same_emits(expected, list(zip(offsets, momenta)))
+
+
+def test_ring_table():
+    r0 = pe.Ring(100, 4)
+    r1 = pe.Ring(100, 4)
+    next(r0)
+    next(r1)
+    assert r0._table is r1._table
+
+    r0.aim = 90
+    v = next(r0)[0]
+    assert approx(v.x, abs=0.001) == -100 and approx(v.y, abs=0.001) == 0
+    assert r0._table is not r1._table
+
+    r0.radius = 10
+    offsets, _ = r0.take(2)
+    assert approx(tuple(offsets[0]), abs=0.001) == (0, -10)
+    assert approx(tuple(offsets[1]), abs=0.001) == (10, 0)
+
+
+def test_live_reconfiguration():
+    r = pe.Ring(100, 4, steps='#')
+    next(r)
+    r.segments = 2
+    r.steps = '#.'
+    r.width = 90
+    v = next(r)[0]
+    assert approx(glm.degrees(glm.atan2(*v.yx)), abs=0.001) == 45
+    assert next(r) is None
+
+    f = pe.Fan(pe.BulletSource(1, pe.Ring(0, 1), pe.Heartbeat(1, '#')), arc=90, segments=2)
+    f.arc = 180
+    f.segments = 3
+    angles = [glm.degrees(glm.atan2(*m.yx)) for _, m in next(f)]
+    assert approx(angles, abs=0.001) == [-90, 0, 90]
+
+
+def test_seeded_emitters():
+    r0 = pe.Ring(100, 8, width=90, randomize=True, jitter=5, seed=7)
+    r1 = pe.Ring(100, 8, width=90, randomize=True, jitter=5, seed=7)
+    expected = [next(r0) for _ in range(5)]
+    assert_same_emits(expected, list(zip(*r1.take(5))))
+
+    for cls, args in ((pe.Disk, (10,)), (pe.Point, ()), (pe.Rectangle, (20, 10))):
+        o0, m0 = cls(*args, seed=3).take(100)
+        o1, m1 = cls(*args, seed=3).take(100)
+        assert (o0 == o1).all() and (m0 == m1).all()
+        assert approx(list(glm.length(glm.vec2(*m)) for m in m0.tolist())) == [1] * 100
+
+    o, _ = pe.Disk(10, seed=3).take(100)
+    assert all(glm.length(glm.vec2(*v)) <= 10 for v in o.tolist())
+
+
+def test_ring_steps_mask():
+    r0 = pe.Ring(100, 5, steps='#..#.')
+    r1 = pe.Ring(100, 5, steps='#..#.')
+    next(r0)
+    next(r1)
+
+    for n in (0, 1, 3, 12, 4):
+        expected = [e for e in (next(r0) for _ in range(n)) if e]
+        assert r1.count(n) == len(expected)
+        assert_same_emits(expected, list(zip(*r1.take(n))))
+
+
+def test_bullet_source_batch():
+    b0 = pe.BulletSource(8, pe.Ring(100, 6, steps='#.#'), pe.Heartbeat(1, '#'), aim=30)
+    b1 = pe.BulletSource(8, pe.Ring(100, 6, steps='#.#'), pe.Heartbeat(1, '#'), aim=30)
+
+    expected = next(b0)
+    offsets, momenta = b1.next_batch()
+    assert len(offsets) == len(expected) == 5
+    assert_same_emits(expected, list(zip(offsets, momenta)))
+
+    offsets, momenta = b1.next_batch()
+    assert offsets.shape == momenta.shape == (0, 2)
+
+
+def test_path():
+    p = pe.Path([(0, 0), (100, 0), (100, 100)], segments=5, steps='##.')
+    assert p.length == approx(200)
+
+    offsets, momenta = p.take(5)
+    assert approx(offsets.ravel().tolist()) == [0, 0, 50, 0, 100, 50, 100, 100]
+    assert approx(momenta.ravel().tolist(), abs=0.001) == [0, 1, 0, 1, -1, 0, -1, 0]
+
+    b = pe.Path([(0, 0), (0, 100), (100, 100), (100, 0)], segments=3, bezier=True)
+    middle = b.take(2)[0][1]
+    assert approx(tuple(middle), abs=0.01) == (50, 75)
+
+    r = pe.Path([(0, 0), (100, 0)], randomize=True, seed=1)
+    offsets, momenta = r.take(50)
+    assert ((offsets[:, 0] >= 0) & (offsets[:, 0] <= 100) & (offsets[:, 1] == 0)).all()
+
+    # Reconfiguring rebuilds the precomputed emits
+    p.segments = 3
+    p.emit_angle = 0
+    p.steps = '#'
+    offsets, momenta = p.take(3)
+    assert approx(offsets.ravel().tolist()) == [0, 0, 100, 0, 100, 100]
+    assert approx(momenta.ravel().tolist(), abs=0.001) == [1, 0, 0, 1, 0, 1]
+    assert approx(tuple(next(p)[1]), abs=0.001) == (1, 0)
+
+
+def test_silhouette():
+    mask = pygame.Mask((6, 6))
+    mask.draw(pygame.Mask((4, 4), fill=True), (1, 1))
+
+    s = pe.Silhouette(mask)
+    assert len(s) == 16
+    offsets, _ = s.take(17)
+    assert tuple(offsets[0]) == tuple(offsets[16]) == approx((-1.5, -1.5))
+
+    s = pe.Silhouette(mask, outline=True, normals=True)
+    assert len(s) == 12
+    offsets, momenta = s.take(len(s))
+    assert approx(tuple(offsets[1])) == (-0.5, -1.5)
+    assert approx(tuple(momenta[1])) == (0, -1)
+    assert approx(tuple(offsets[5])) == (1.5, -0.5)
+    assert approx(tuple(momenta[5])) == (1, 0)
+
+
+def test_line_basis():
+    line = pe.Line(0, 100, steps=3)
+    assert approx(tuple(next(line)[0])) == (-50, 0)
+
+    line.angle = 90
+    line.anchor = 0
+    pos, momentum = next(line)
+    assert approx(tuple(pos), abs=0.001) == (0, 50)
+    assert approx(tuple(momentum), abs=0.001) == (-1, 0)
+
+    offsets, momenta = line.take(2)
+    assert approx(offsets.ravel().tolist(), abs=0.001) == [0, 100, 0, 0]
+    assert approx(momenta.ravel().tolist(), abs=0.001) == [-1, 0, -1, 0]
+
+
+def test_heartbeat_clock():
+    clock = pe.Clock()
+    h = pe.Heartbeat(1, '#.#.', clock=clock)
+    assert next(h) == 1 and h.ages == [0]
+    assert next(h) == 0
+
+    clock.tick(1.1)
+    assert next(h) == 2
+    assert approx(h.ages) == [0.6, 0.1]
+
+    assert approx(h.advance(0.5)) == [0.1]
+
+
+def test_bullet_source_catch_up():
+    clock = pe.Clock()
+    b = pe.Stack(pe.BulletSource(2, pe.Ring(100, 2), pe.Heartbeat(1, '#', clock=clock)),
+                 height=2, gain=1)
+    next(b)
+    clock.tick(2.5)
+    assert len(next(b)) == 8
+    assert approx(b.delays) == [1.5] * 4 + [0.5] * 4
+
+
+def test_factory_scheduler():
+    clock = pe.Clock()
+    spawned = []
+    sprite_factory = lambda position, momentum, factory_momentum: spawned.append(position)
+
+    factory = pe.Factory(pe.BulletSource(1, pe.Ring(0, 1), pe.Heartbeat(1, '#...', clock=clock),
+                                         max_emits=3),
+                         sprite_factory)
+    idle = pe.Factory(pe.BulletSource(1, pe.Ring(0, 1), pe.Heartbeat(1, '....', clock=clock)),
+                      sprite_factory)
+    scheduler = pe.FactoryScheduler([factory, idle])
+
+    scheduler.update(0)
+    assert len(spawned) == 1
+    assert scheduler._queue[0][0] == approx(1)
+
+    for _ in range(40):
+        clock.tick(0.1)
+        scheduler.update(0.1)
+
+    assert len(spawned) == 3
+    assert len(scheduler) == 1
+
+    # Re-adding a removed factory doesn't leave its old entry polling
+    spawned.clear()
+    factory = pe.Factory(pe.BulletSource(1, pe.Ring(0, 1), pe.Heartbeat(1, '#', clock=clock)),
+                         sprite_factory)
+    scheduler = pe.FactoryScheduler([factory])
+    scheduler.remove(factory)
+    scheduler.add(factory)
+    for _ in range(5):
+        scheduler.update(1)
+        clock.tick(1)
+    assert len(scheduler._queue) == 1
+    assert len(spawned) == 5
+
+    # Wall clock heartbeats
+    spawned.clear()
+    factory = pe.Factory(pe.BulletSource(1, pe.Ring(0, 1), pe.Heartbeat(0.1, '#')), sprite_factory)
+    scheduler = pe.FactoryScheduler([factory])
+    scheduler.update(0)
+    assert len(spawned) == 1
+    assert 0 < scheduler._queue[0][0] <= 0.1
+    sleep(0.11)
+    scheduler.update(0.11)
+    assert len(spawned) == 2
+
+
+def test_emit_buffer():
+    clock = pe.Clock()
+    b0 = pe.BulletSource(4, pe.Ring(100, 4), pe.Heartbeat(1, '#', clock=clock), aim=90)
+    b1 = pe.BulletSource(4, pe.Ring(100, 4), pe.Heartbeat(1, '#', clock=clock), aim=90)
+    buffer = pe.EmitBuffer(2)
+
+    for _ in range(2):
+        expected = next(b0)
+        offsets, momenta = b1.next_batch(out=buffer)
+        assert len(buffer) == len(offsets) == len(expected)
+        assert offsets.base is buffer.offsets
+        assert_same_emits(expected, list(zip(offsets, momenta)))
+        clock.tick(2)
+
+    assert approx(b1.delays) == [1] * 4 + [0] * 4
+
+
+def test_compiled_pattern():
+    def factory(clock, spawned):
+        source = pe.BulletSource(5, pe.Ring(100, 5), pe.Heartbeat(1, '#', clock=clock), aim=15)
+        poms = pe.POMS(glm.vec2(10, 20), 30, glm.vec2(), 0)
+        return pe.Factory(pe.Fan(pe.Stack(source, 3, 0.5), 90, 3),
+                          lambda position, momentum, factory_momentum: spawned.append((position, momentum)),
+                          poms)
+
+    clock = pe.Clock()
+    plain, fused = [], []
+    f0 = factory(clock, plain)
+    f1 = factory(clock, fused).compile()
+    assert isinstance(f1.bullet_source, pe.CompiledPattern)
+
+    for _ in range(2):
+        f0.update(0)
+        f1.update(0)
+        clock.tick(1)
+        f0.bullet_source.segments = 4
+        f1.bullet_source.pattern.segments = 4
+
+    assert len(plain) == len(fused) == 5 * 3 * 3 + 5 * 3 * 4
+    assert_same_emits(plain, fused)
+
+    # Only compiled factories need an emit buffer, and idle frames skip the copy tables
+    assert f0._buffer is None and f1._buffer is not None
+    f1.update(0)
+    f1.bullet_source._stage_copies = None
+    clock.tick(0.5)
+    f1.update(0)
+    assert f1.bullet_source._stage_copies is None
+    assert len(f1.bullet_source.delays) == 0
+
+    with pytest.raises(TypeError):
+        pe.CompiledPattern(object())
+
+
+def test_batch_factory():
+    calls = []
+
+    def batch_factory(positions, momenta, factory_momentum, delays):
+        calls.append((positions, momenta, factory_momentum, delays))
+
+    def source():
+        return pe.BulletSource(4, pe.Ring(100, 4), pe.Heartbeat(1, '#', clock=clock))
+
+    clock = pe.Clock()
+    poms = pe.POMS(glm.vec2(10, 20), 0, glm.vec2(1, 0), 0)
+    plain = pe.Factory(source(), poms=poms, batch_factory=batch_factory)
+    fused = pe.Factory(source(), poms=poms, batch_factory=batch_factory).compile()
+
+    plain.update(0)
+    fused.update(0)
+    assert len(calls) == 2
+
+    (p0, m0, fm0, d0), (p1, m1, fm1, d1) = calls
+    assert isinstance(p0, list) and p1.shape == (4, 2)
+    assert fm0 == fm1 == glm.vec2(1, 0)
+    assert list(d0) == list(d1) == [0] * 4
+    for a, b in zip(p0 + m0, p1.tolist() + m1.tolist()):
+        assert approx(tuple(a), abs=0.001) == b
+
+    # Frames without an emit don't call the batch factory
+    for _ in range(4):
+        clock.tick(0.2)
+        plain.update(0.2)
+        fused.update(0.2)
+    assert len(calls) == 2
+
+    spawned = []
+    adapter = pe.per_bullet(lambda position, momentum, factory_momentum:
+                            spawned.append((position, momentum)))
+    adapter(p1, m1, factory_momentum=fm1, delays=d1)
+    adapter(p0, m0, factory_momentum=fm0)
+    assert len(spawned) == 8
+    assert tuple(spawned[0][0]) == approx(tuple(spawned[4][0]), abs=0.001)
+
+    with pytest.raises(TypeError):
+        pe.Factory(source())
+
+
+def test_transform():
+    def source():
+        return pe.BulletSource(4, pe.Ring(100, 4), pe.Heartbeat(1, '#', clock=clock))
+
+    clock = pe.Clock()
+    t = pe.Transform(pe.Transform(source(), mirror=True, scale=2), rotate=90, translate=(5, 0))
+    assert t.matrix.flatten().tolist() == approx([0, -1, 5, 1, 0, 0], abs=0.001)
+
+    # Ring(100, 4) starts at (100, 0), then (0, 100)
+    emit = next(t)
+    assert approx(tuple(emit[0][0]), abs=0.001) == (5, 200)
+    assert approx(tuple(emit[1][0]), abs=0.001) == (205, 0)
+    assert approx(tuple(emit[1][1]), abs=0.001) == (2, 0)
+
+    spawned = []
+    sprite_factory = lambda position, momentum, factory_momentum: spawned.append((position, momentum))
+    plain = pe.Factory(pe.Fan(pe.Transform(pe.Transform(source(), scale=(1, 0.5)),
+                                           matrix=[[1, 0.5, 0], [0, 1, 10]]), 90, 3),
+                       sprite_factory)
+    fused = pe.Factory(pe.Fan(pe.Transform(pe.Transform(source(), scale=(1, 0.5)),
+                                           matrix=[[1, 0.5, 0], [0, 1, 10]]), 90, 3),
+                       sprite_factory).compile()
+
+    plain.update(0)
+    fused.update(0)
+    clock.tick(1)
+    plain.bullet_source.bullet_source.rotate = fused.bullet_source.pattern.bullet_source.rotate = 45
+    plain.update(0)
+    fused.update(0)
+
+    assert len(spawned) == 48
+    first, second = spawned[:12] + spawned[24:36], spawned[12:24] + spawned[36:]
+    assert_same_emits(first, second)
+
+
+def test_time_varying_aim():
+    class Aim:
+        """Like a LerpThing, a new value every time it's read."""
+        def __init__(self):
+            self.value = -90
+
+        def __float__(self):
+            self.value += 90
+            return float(self.value)
+
+    clock = pe.Clock()
+    source = pe.BulletSource(1, pe.Ring(0, 1), pe.Heartbeat(1, '#', clock=clock), aim=Aim())
+    momenta = []
+    for _ in range(3):
+        momenta.extend(tuple(momentum) for _, momentum in next(source))
+        clock.tick(1)
+
+    assert momenta == [approx(m, abs=0.001) for m in ((1, 0), (0, 1), (-1, 0))]
+
+
+def test_symmetry():
+    def source():
+        return pe.BulletSource(2, pe.Ring(100, 8, aim=45), pe.Heartbeat(1, '#', clock=clock))
+
+    clock = pe.Clock()
+    s = pe.Symmetry(source(), 4, mirror=True)
+
+    # 2 bullets at 45° and 90°, 4 folds, each with a mirrored copy
+    emit = next(s)
+    assert len(emit) == len(s.delays) == 16
+    assert approx(tuple(emit[0][0]), abs=0.001) == (70.711, 70.711)
+    assert approx(tuple(emit[1][0]), abs=0.001) == (70.711, -70.711)
+    assert approx(tuple(emit[2][0]), abs=0.001) == (-70.711, 70.711)
+    assert approx(tuple(emit[9][1]), abs=0.001) == (0, -1)
+
+    spawned = []
+    sprite_factory = lambda position, momentum, factory_momentum: spawned.append((position, momentum))
+    plain = pe.Factory(pe.Symmetry(source(), 3, mirror=True, axis=90), sprite_factory)
+    fused = pe.Factory(pe.Symmetry(source(), 3, mirror=True, axis=90), sprite_factory).compile()
+
+    plain.update(0)
+    fused.update(0)
+    clock.tick(1)
+    plain.bullet_source.folds = fused.bullet_source.pattern.folds = 5
+    plain.update(0)
+    fused.update(0)
+
+    assert len(spawned) == 2 * (12 + 20)
+    first, second = spawned[:12] + spawned[24:44], spawned[12:24] + spawned[44:]
+    assert_same_emits(first, second)
+
+
+def test_bake():
+    def pattern(clock=None):
+        return pe.Stack(pe.BulletSource(2, pe.Ring(100, 8), pe.Heartbeat(1, '#.#.', clock=clock),
+                                        aim=30),
+                        2, 1.5)
+
+    timeline = pe.bake(pattern(), 2)
+    assert len(timeline.times) == 16
+    assert timeline.times.tolist() == approx([0] * 4 + [0.5] * 4 + [1] * 4 + [1.5] * 4, abs=0.001)
+    assert not timeline.offsets.flags.writeable
+
+    clock = pe.Clock()
+    live = pattern(clock)
+    baked = pe.BakedSource(timeline, clock=clock)
+    for _ in range(8):
+        expected = next(live)
+        emit = next(baked)
+        assert len(emit) == len(expected) == 4
+        assert_same_emits(emit, expected)
+        assert baked.next_emit() == approx(0.5)
+        clock.tick(0.5)
+
+    # Missed emits are caught up across the loop, with their delays
+    clock.tick(0.75)
+    assert len(next(baked)) == 8
+    assert baked.delays == approx([0.75] * 4 + [0.25] * 4)
+
+    once = pe.BakedSource(timeline, clock=clock, loop=False)
+    clock.tick(2)
+    offsets, momenta = once.next_batch(orientation=90)
+    assert len(offsets) == 16 and once.delays[0] == approx(2)
+    assert approx(tuple(offsets[0]), abs=0.001) == (-50, 86.603)
+    with pytest.raises(StopIteration):
+        next(once)
+
+
+def test_pattern_template():
+    def pattern(clock=None):
+        return pe.Fan(pe.Stack(pe.BulletSource(3, pe.Ring(100, 6, steps='##.'),
+                                               pe.Heartbeat(1, '#', clock=clock), aim=10),
+                               2, 1.5),
+                      60, 3)
+
+    spawned = []
+    sprite_factory = lambda position, momentum, factory_momentum: spawned.append((position, momentum))
+
+    clock = pe.Clock()
+    template = pe.PatternTemplate(pattern())
+    factories = [template.factory(sprite_factory, clock=clock) for _ in range(3)]
+    reference = pe.Factory(pattern(clock), sprite_factory).compile()
+
+    a, b = (factory.bullet_source for factory in factories[:2])
+    assert a.stages is b.stages
+
+    others = []
+    factories[2] = template.factory(lambda p, m, factory_momentum: others.append((p, m)), clock=clock)
+    for _ in range(3):
+        factories[0].update(0)
+        factories[2].update(0)
+        reference.update(0)
+        clock.tick(1)
+    assert len(others) == 36
+
+    assert len(spawned) == 2 * 36
+    first = [bullet for i in range(0, 72, 24) for bullet in spawned[i:i + 12]]
+    second = [bullet for i in range(12, 72, 24) for bullet in spawned[i:i + 12]]
+    assert_same_emits(first, second)
+    assert_same_emits(first, others)
+
+    # The other instances didn't move on
+    assert factories[1].bullet_source._ring_phase == (0, 0)
+    assert factories[1].bullet_source.emits == 0
+    assert factories[0].bullet_source.emits == reference.bullet_source.source.emits
+
+    # A running template factory is lighter than a factory with its own chain
+    def footprint(make_factory):
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        factories = [make_factory() for _ in range(100)]
+        for factory in factories:
+            factory.update(0)
+        size = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        del factories
+        return size
+
+    nop = lambda position, momentum, factory_momentum: None
+    template_size = footprint(lambda: template.factory(nop, clock=clock))
+    chain_size = footprint(lambda: pe.Factory(pattern(clock), nop))
+    assert template_size * 1.5 < chain_size
+
+
+def test_advance():
+    class Sprite:
+        def __init__(self, position, momentum, factory_momentum):
+            self.poms = pe.POMS(position, 0, momentum * 100 + factory_momentum)
+
+    def factory(clock, sprites):
+        source = pe.BulletSource(4, pe.Ring(10, 4), pe.Heartbeat(1, '#.', clock=clock), aim=45)
+        return pe.Factory(pe.Stack(source, 2, 2),
+                          lambda *args, **kwargs: sprites.append(Sprite(*args, **kwargs)) or sprites[-1],
+                          pe.POMS(glm.vec2(500, 500), 45, glm.vec2(0, 10)))
+
+    # Fast forwarding equals one big frame of a clocked factory
+    clock = pe.Clock()
+    stepped, advanced, culled = [], [], []
+    f0 = factory(clock, stepped)
+    f1 = factory(clock, advanced)
+    f2 = factory(clock, culled)
+    clock.tick(2.5)
+    f0.update(0)
+    f1.advance(2.5)
+    f2.advance(2.5, speed=100, world=pygame.Rect(0, 0, 1000, 1000))
+
+    assert len(stepped) == len(advanced) == 3 * 4 * 2
+    for s0, s1 in zip(stepped, advanced):
+        assert approx(tuple(s0.poms.position), abs=0.001) == tuple(s1.poms.position)
+
+    # The doubled stack level of the first beat flew 500 pixels, and left
+    # the world, besides the bullet flying against the factory momentum
+    assert len(culled) == 24 - 3
+    assert all(0 <= s.poms.position.x < 1000 and 0 <= s.poms.position.y < 1000 for s in culled)
+
+    # The factory continues in phase after fast forwarding
+    assert f1.next_emit() == approx(0.5)
+
+    # Without a clock, the wall clock pattern continues after the advanced steps
+    heartbeat = pe.Heartbeat(1, '#..')
+    assert heartbeat.advance(1.5) == approx([1.5, 0.5])
+    assert heartbeat.pattern[heartbeat._step] == '.'
+    assert heartbeat.next_beat() == approx(1 / 6, abs=0.01)
+    assert not next(heartbeat)
+
+
+def test_emit_budget():
+    class Sprite:
+        def __init__(self, position, momentum, factory_momentum):
+            self.poms = pe.POMS(position, 0, momentum * 10)
+
+    def factory(clock, sprites, budget=None):
+        return pe.Factory(pe.BulletSource(10, pe.Ring(0, 10), pe.Heartbeat(10, '#', clock=clock)),
+                          lambda *args, **kwargs: sprites.append(Sprite(*args, **kwargs)) or sprites[-1],
+                          budget=budget)
+
+    clock = pe.Clock()
+    direct, budgeted, compiled = [], [], []
+    f0 = factory(clock, direct)
+    f1 = factory(clock, budgeted, budget=4)
+    f2 = factory(clock, compiled, budget=4).compile()
+
+    for frame in range(3):
+        for f in (f0, f1, f2):
+            f.update(0.1)
+        assert len(budgeted) == len(compiled) == min(4 * (frame + 1), 10)
+        for sprite in direct + budgeted + compiled:
+            sprite.poms.position += sprite.poms.momentum * 0.1
+        clock.tick(0.1)
+
+    assert f1.deferred == f2.deferred == 0
+    assert len(direct) == 10
+    for s0, s1, s2 in zip(direct, budgeted, compiled):
+        assert approx(tuple(s0.poms.position), abs=0.001) == tuple(s1.poms.position)
+        assert approx(tuple(s0.poms.position), abs=0.001) == tuple(s2.poms.position)
+
+    # Deferred bullets reach an uncompiled batch factory as vec2 lists, too
+    batches = []
+    f3 = pe.Factory(pe.BulletSource(10, pe.Ring(0, 10), pe.Heartbeat(10, '#', clock=clock)),
+                    batch_factory=lambda *args, **kwargs: batches.append(args), budget=4)
+    for _ in range(3):
+        f3.update(0.1)
+    assert [len(positions) for positions, _ in batches] == [4, 4, 2]
+    assert all(type(positions) is list and type(momenta[0]) is glm.vec2
+               for positions, momenta in batches)
+
+
+def test_bullet_budget():
+    group = pygame.sprite.Group()
+
+    class Sprite(pygame.sprite.Sprite):
+        def __init__(self, position, momentum, factory_momentum):
+            super().__init__(group)
+            self.poms = pe.POMS(position, 0, momentum)
+
+    def factory(budget, priority=0, radius=0):
+        return pe.Factory(pe.BulletSource(4, pe.Ring(radius, 4), pe.Heartbeat(1, '#', clock=clock)),
+                          Sprite, bullet_budget=budget, priority=priority)
+
+    clock = pe.Clock()
+    budget = pe.BulletBudget(10)
+    low = factory(budget)
+
+    for _ in range(3):
+        low.update(0)
+        clock.tick(1)
+    assert len(group) == len(budget) == 10
+    assert budget.stats.dropped == 2 and budget.stats.limit_hits == 1
+
+    # Bullets that die on their own free up room
+    group.sprites()[0].kill()
+    assert len(budget) == 9
+
+    # Higher priorities replace lower priority bullets, oldest first
+    oldest = [sprite for sprite in budget._bullets[0]][:3]
+    high = factory(budget, priority=1)
+    high.update(0)
+    assert len(group) == 10
+    assert not any(sprite.alive() for sprite in oldest)
+    assert budget.stats.recycled == 3
+
+    # Recycle the bullets furthest off screen
+    group.empty()
+    budget = pe.BulletBudget(6, policy='offscreen', world=pygame.Rect(-50, -50, 100, 100))
+    far, near = factory(budget, radius=200), factory(budget, radius=10)
+    far.update(0)
+    near.update(0)
+    assert len(group) == 6
+    distances = sorted(glm.length(s.poms.position) for s in group)
+    assert distances == approx([10] * 4 + [200] * 2)
+
+    with pytest.raises(ValueError):
+        pe.BulletBudget(10, policy='newest')
+
+    # Sprites the budget can't track are rejected
+    untracked = pe.Factory(pe.BulletSource(4, pe.Ring(0, 4), pe.Heartbeat(1, '#', clock=clock)),
+                           lambda *args, **kwargs: None, bullet_budget=pe.BulletBudget(10))
+    with pytest.raises(TypeError):
+        untracked.update(0)
+
+
+def test_bullet_pool():
+    mutators = (pe.AccelerationMutator, pe.TurnMutator, pe.MomentumMutator, pe.SpinMutator,
+                pe.AlignWithMomentumMutator)
+    world = pygame.Rect(-400, -400, 800, 800)
+    image = pygame.Surface((4, 4))
+    group = pygame.sprite.Group()
+
+    pool = pe.BulletPool(capacity=2, mutators=mutators + (pe.WorldMutator,), world=world)
+    bullets = []
+    for i in range(5):
+        position, momentum = glm.vec2(i * 10, 0), glm.vec2(10, 20 * i)
+        spin, max_speed = 30 * i, 15 if i % 2 else 0
+        acceleration = glm.vec2(0, -5)
+
+        bullet = pe.Bullet(image, pe.POMS(position, 0, momentum, spin=spin, max_speed=max_speed),
+                           group)
+        for m in mutators:
+            args = (acceleration,) if m is pe.AccelerationMutator else ()
+            bullet.mutators.add(m(bullet, *args))
+        bullets.append(bullet)
+        pool.spawn([position], [momentum], spin=spin, max_speed=max_speed,
+                   acceleration=acceleration)
+
+    assert len(pool) == 5
+
+    for _ in range(10):
+        group.update(0.1)
+        pool.update(0.1)
+
+    for i, bullet in enumerate(bullets):
+        assert approx(tuple(bullet.poms.position), abs=0.01) == tuple(pool.position[i])
+        assert approx(tuple(bullet.poms.momentum), abs=0.01) == tuple(pool.momentum[i])
+        assert bullet.poms.orientation == approx(pool.orientation[i], abs=0.01)
+
+    # Bullets leaving the world are removed, the last ones fill the gaps
+    pool.position[1] = (500, 0)
+    pool.position[2] = (0, -500)
+    survivors = [tuple(pool.position[i]) for i in (0, 3, 4)]
+    pool.update(0)
+    assert len(pool) == 3
+    assert [tuple(p) for p in pool.position] == survivors
+
+    # Spawning from a factory
+    pool = pe.BulletPool()
+    factory = pe.Factory(pe.BulletSource(4, pe.Ring(10, 4), pe.Heartbeat(1, '#')),
+                         batch_factory=pool.batch_factory(100))
+    factory.update(0)
+    assert len(pool) == 4
+    assert approx(sorted(glm.length(glm.vec2(m)) for m in pool.momentum)) == [100] * 4
+
+    # Mutator instances use their own attributes instead of the pool's
+    pool = pe.BulletPool(mutators=(pe.AccelerationMutator(None, glm.vec2(0, 10)),
+                                   pe.WorldMutator(None, pygame.Rect(0, 0, 100, 100))))
+    pool.spawn([(50, 50), (150, 50), (50, 150)], [(0, 0)] * 3, acceleration=(5, 0))
+    pool.update(1)
+    assert len(pool) == 1
+    assert tuple(pool.momentum[0]) == (0, 10)
+
+    with pytest.raises(ValueError):
+        pe.BulletPool(mutators=(pe.BounceMutator,))
+
+
+def test_batch_mutator():
+    class Drag(pe.Mutator):
+        def __init__(self, parent, drag):
+            super().__init__(parent)
+            self.drag = drag
+
+        def __call__(self, dt):
+            self.parent.poms.momentum *= 1 - self.drag * dt
+            if self.parent.poms.position.y > 100:
+                self.parent.kill()
+
+    class BatchDrag(Drag):
+        def apply_batch(self, dt, pool, indices):
+            pool.momentum[indices] *= 1 - self.drag * dt
+            pool.kill(np.flatnonzero(pool.position[indices, 1] > 100))
+
+    positions = [(0, 0), (10, 50), (20, 90)]
+    momenta = [(10, 100), (0, 50), (5, 150)]
+    pools = [pe.BulletPool(mutators=(pe.MomentumMutator, m(None, 0.5))) for m in (Drag, BatchDrag)]
+    for pool in pools:
+        pool.spawn(positions, momenta)
+        for _ in range(5):
+            pool.update(0.1)
+
+    per_bullet, batched = pools
+    assert len(per_bullet) == len(batched) == 2
+    assert approx(per_bullet.position.ravel().tolist(), abs=0.001) == batched.position.ravel().tolist()
+    assert approx(per_bullet.momentum.ravel().tolist(), abs=0.001) == batched.momentum.ravel().tolist()
+
+    # The stand in parent is only borrowed
+    assert pools[0].mutators[1].parent is None
+
+    with pytest.raises(ValueError):
+        pe.BulletPool(mutators=(Drag,))
+
+
+def test_mutator_allocations():
+    class Sprite:
+        def __init__(self, i):
+            self.poms = pe.POMS((i, 0), 0, (10, 20), spin=30, max_speed=15 if i % 2 else 0)
+
+    sprites = [Sprite(i) for i in range(100)]
+    mutators = [mutator(sprite) for sprite in sprites
+                for mutator in (pe.MomentumMutator, pe.SpinMutator, pe.TurnMutator)]
+    position, momentum = sprites[0].poms.position, sprites[0].poms.momentum
+    for mutator in mutators:
+        mutator(0.016)
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(10):
+            frame = iter(mutators)
+            tracemalloc.reset_peak()
+            start, _ = tracemalloc.get_traced_memory()
+            for mutator in frame:
+                mutator(0.016)
+            peaks.append(tracemalloc.get_traced_memory()[1] - start)
+    finally:
+        tracemalloc.stop()
+
+    # Bytes allocated per bullet per frame
+    assert min(peaks) / len(sprites) == 0
+
+    # The vectors are updated in place
+    assert sprites[0].poms.position is position and sprites[0].poms.momentum is momentum
+    assert not hasattr(sprites[0].poms, '__dict__')
+
+
+def test_compiled_mutator_stack():
+    calls = []
+
+    class Once(pe.Mutator):
+        def __call__(self, dt):
+            calls.append(type(self))
+            del self.parent.mutators[type(self)]
+            self.parent.mutators.add(Counter(self.parent))
+
+    class Counter(pe.Mutator):
+        def __call__(self, dt):
+            calls.append(type(self))
+
+    bullet = pe.Bullet(pygame.Surface((4, 4)), pe.POMS((0, 0), 0, (10, 0)))
+    bullet.mutators.add(Once(bullet), pe.MomentumMutator(bullet))
+    compiled = bullet.mutators.compiled
+    assert bullet.mutators.compiled is compiled
+
+    # Changes while running take effect in the next frame
+    bullet.update(1)
+    assert calls == [Once]
+    assert list(bullet.mutators) == [pe.MomentumMutator, Counter]
+    assert bullet.poms.position == glm.vec2(10, 0)
+
+    bullet.update(1)
+    assert calls == [Once, Counter]
+    assert bullet.poms.position == glm.vec2(20, 0)
+    assert bullet.mutators.compiled is not compiled
+
+    bullet.mutators.clear()
+    bullet.update(1)
+    assert calls == [Once, Counter]
+    assert bullet.poms.position == glm.vec2(20, 0)
+
+
+def test_integrator_mutator():
+    class Sprite:
+        def __init__(self, max_speed):
+            self.poms = pe.POMS((10, 20), 30, (50, 0), spin=40, max_speed=max_speed, max_spin=25)
+            self.mutators = pe.poms.MutatorStack()
+
+    acceleration = glm.vec2(0, 30)
+    configs = [
+        (dict(), (pe.MomentumMutator,)),
+        (dict(turn=True, align='momentum'),
+         (pe.TurnMutator, pe.MomentumMutator, pe.AlignWithMomentumMutator)),
+        (dict(acceleration=acceleration, turn=True, spin=True),
+         (pe.AccelerationMutator, pe.TurnMutator, pe.MomentumMutator, pe.SpinMutator)),
+        (dict(acceleration=acceleration, spin=True, align='acceleration'),
+         (pe.AccelerationMutator, pe.MomentumMutator, pe.SpinMutator,
+          pe.AlignWithAccelerationMutator)),
+    ]
+    for max_speed in (0, 60):
+        for kwargs, stack in configs:
+            fused, separate = Sprite(max_speed), Sprite(max_speed)
+            fused.mutators.add(pe.IntegratorMutator(fused, **kwargs))
+            separate.mutators.add([m(separate, acceleration) if m is pe.AccelerationMutator
+                                   else m(separate) for m in stack])
+            for _ in range(20):
+                fused.mutators.run(0.05)
+                separate.mutators.run(0.05)
+
+            assert approx(tuple(fused.poms.position), abs=0.01) == tuple(separate.poms.position)
+            assert approx(tuple(fused.poms.momentum), abs=0.01) == tuple(separate.poms.momentum)
+            assert fused.poms.orientation == approx(separate.poms.orientation, abs=0.01)
+
+            # The same in a pool, vectorized
+            poms = Sprite(max_speed).poms
+            pool = pe.BulletPool(mutators=(pe.IntegratorMutator(None, **kwargs),))
+            pool.spawn([poms.position] * 2, [poms.momentum] * 2, orientation=poms.orientation,
+                       spin=poms.spin, max_speed=max_speed, max_spin=poms.max_spin)
+            for _ in range(20):
+                pool.update(0.05)
+
+            for i in range(2):
+                assert approx(tuple(fused.poms.position), abs=0.01) == tuple(pool.position[i])
+                assert approx(tuple(fused.poms.momentum), abs=0.01) == tuple(pool.momentum[i])
+                assert fused.poms.orientation == approx(pool.orientation[i], abs=0.01)
+
+    with pytest.raises(ValueError):
+        pe.IntegratorMutator(None, align='target')
+    with pytest.raises(ValueError):
+        pe.IntegratorMutator(None, align='acceleration')
+
+
 if __name__ == "__main__":
     test_ring_circle()
     test_ring_arc()
@@ -72,3 +949,32 @@ if __name__ == "__main__":
     test_ring_heartbeat()
     test_heartbeat()
     test_bullet_source()
+    test_ring_take()
+    test_emitters_take()
+    test_ring_table()
+    test_live_reconfiguration()
+    test_seeded_emitters()
+    test_ring_steps_mask()
+    test_bullet_source_batch()
+    test_path()
+    test_silhouette()
+    test_line_basis()
+    test_heartbeat_clock()
+    test_bullet_source_catch_up()
+    test_factory_scheduler()
+    test_emit_buffer()
+    test_compiled_pattern()
+    test_batch_factory()
+    test_transform()
+    test_time_varying_aim()
+    test_symmetry()
+    test_bake()
+    test_pattern_template()
+    test_advance()
+    test_emit_budget()
+    test_bullet_budget()
+    test_bullet_pool()
+    test_batch_mutator()
+    test_mutator_allocations()
+    test_compiled_mutator_stack()
+    test_integrator_mutator()